@@ -0,0 +1,208 @@
+# coding_platform_flask/admission.py
+
+# Admission control for the grading endpoint (`/api/evaluate`).
+#
+# Grading a Python submission starts a subprocess that may run for several seconds,
+# so a single user repeatedly clicking "Run" could otherwise tie up the whole server.
+# This module provides three layers of protection:
+#   1. Coalescing: an identical submission (same session, question and code) that is
+#      already being graded is not graded again; the duplicate waits for and reuses
+#      the in-flight result.
+#   2. Per-session token buckets: each session may start a limited number of gradings
+#      per second, with a small burst allowance.
+#   3. A global concurrency cap tied to grader capacity, with a bounded wait queue.
+#      When the queue is full (or the wait times out) the request is shed with a
+#      retry-after hint instead of piling up until it times out.
+# Coalescing is checked first, then the queue cap, then the session's bucket: requests shed
+# because the server is overloaded do not use up the session's tokens.
+
+import hashlib # For building compact coalescing keys from submissions
+import threading # Locks, semaphores and events for cross-request coordination
+import time # Monotonic clock for token refill and wait timeouts
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a grading request is not admitted.
+    :param reason: Short machine-readable reason ("rate_limited" or "overloaded").
+    :param retry_after: Suggested number of seconds before the client retries.
+    """
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    A classic token bucket: holds up to `capacity` tokens, refilled at `rate` tokens per second.
+    Not thread-safe on its own; AdmissionController guards it with its lock.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self.updated) # `now` may predate a bucket created during the same call
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def try_take(self, now=None):
+        """
+        Attempts to consume one token.
+        :return: 0 if a token was taken, otherwise the number of seconds until one is available.
+        """
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class _InFlight:
+    """Holds the shared outcome of a grading that duplicate requests can wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AdmissionController:
+    """
+    Coordinates grading admission across all request threads of one worker process.
+    :param max_concurrency: Number of gradings allowed to run at the same time.
+    :param max_queue: Number of admitted requests allowed to wait for a free grading slot.
+    :param queue_timeout: Seconds a queued request waits for a slot before being shed.
+    :param rate: Per-session token refill rate (gradings per second).
+    :param burst: Per-session bucket capacity (gradings allowed in a quick burst).
+    :param bucket_idle_seconds: Buckets unused for this long are dropped to bound memory.
+    """
+    def __init__(self, max_concurrency, max_queue, queue_timeout, rate, burst, bucket_idle_seconds=600):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate
+        self.burst = burst
+        self.bucket_idle_seconds = bucket_idle_seconds
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._buckets = {} # session key -> TokenBucket
+        self._in_flight = {} # coalescing key -> _InFlight
+        self._last_sweep = time.monotonic()
+
+        # Counters exposed through stats()
+        self._running = 0
+        self._queued = 0
+        self._counters = {
+            "admitted": 0,
+            "coalesced": 0,
+            "rejected_rate_limited": 0,
+            "rejected_overloaded": 0,
+        }
+
+    @staticmethod
+    def coalescing_key(session_key, question_id, submission):
+        """Builds the key under which identical in-flight submissions are merged."""
+        digest = hashlib.sha256(str(submission).encode('utf-8')).hexdigest()
+        return f"{session_key}:{question_id}:{digest}"
+
+    def _sweep_buckets(self, now):
+        # Drop idle buckets at most once a minute; buckets left idle are full anyway.
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        cutoff = now - self.bucket_idle_seconds
+        for key in [k for k, b in self._buckets.items() if b.updated < cutoff]:
+            del self._buckets[key]
+
+    def _retry_after_overload(self):
+        # Queued requests are shed after queue_timeout, so the backlog clears within that window.
+        return max(1, int(self.queue_timeout))
+
+    def run(self, session_key, question_id, submission, grade):
+        """
+        Runs `grade()` under admission control and returns its result.
+        Identical in-flight submissions from the same session share a single call to `grade()`.
+        :param session_key: Stable identifier of the submitting session.
+        :param question_id: The question being graded.
+        :param submission: The raw submission (code or MCQ answer), used for coalescing.
+        :param grade: Zero-argument callable performing the actual evaluation.
+        :return: A tuple (result, coalesced) where `coalesced` is True if the result was shared.
+        :raises AdmissionRejected: If the request is rate limited or the grader is overloaded.
+        """
+        key = self.coalescing_key(session_key, question_id, submission)
+
+        with self._lock:
+            shared = self._in_flight.get(key)
+            owner = shared is None
+            if not owner:
+                # Duplicate of a grading already in progress: wait for it instead of re-running.
+                self._counters["coalesced"] += 1
+            else:
+                # Shed load before charging the session: a request refused because the server is
+                # overloaded must not cost the user a token.
+                if self._running >= self.max_concurrency and self._queued >= self.max_queue:
+                    self._counters["rejected_overloaded"] += 1
+                    raise AdmissionRejected("overloaded", self._retry_after_overload())
+                now = time.monotonic()
+                self._sweep_buckets(now)
+                bucket = self._buckets.get(session_key)
+                if bucket is None:
+                    bucket = self._buckets[session_key] = TokenBucket(self.rate, self.burst)
+                wait = bucket.try_take(now)
+                if wait:
+                    self._counters["rejected_rate_limited"] += 1
+                    raise AdmissionRejected("rate_limited", max(1, int(wait + 0.999)))
+                shared = self._in_flight[key] = _InFlight()
+                self._queued += 1
+
+        if not owner:
+            # Give the owner its queue wait plus a generous grading allowance before giving up.
+            if not shared.done.wait(self.queue_timeout + 30):
+                raise AdmissionRejected("overloaded", self._retry_after_overload())
+            if shared.error is not None:
+                raise shared.error
+            return shared.result, True
+
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+            with self._lock:
+                self._queued -= 1
+                if acquired:
+                    self._running += 1
+                    self._counters["admitted"] += 1
+                else:
+                    self._counters["rejected_overloaded"] += 1
+            if not acquired:
+                raise AdmissionRejected("overloaded", self._retry_after_overload())
+            try:
+                shared.result = grade()
+            finally:
+                self._slots.release()
+                with self._lock:
+                    self._running -= 1
+        except BaseException as e:
+            shared.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            shared.done.set()
+        return shared.result, False
+
+    def stats(self):
+        """Returns a snapshot of queue depth, running gradings and admission counters."""
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._queued,
+                "in_flight": len(self._in_flight),
+                "tracked_sessions": len(self._buckets),
+                **self._counters,
+            }
@@ -3,13 +3,26 @@ from flask import Flask, render_template, request, redirect, url_for, session, j
 import sqlite3 # For database interaction
 import json # For handling JSON data, especially in Python code evaluation
 import subprocess # For running external processes (Python code evaluation)
+import tempfile # Results file of the Python test runner
 import os # For interacting with the operating system (file paths, environment variables)
 import time # For timing tests and questions
-import tempfile # For creating temporary files (Python code evaluation)
+import pickle # For sending test cases to the Python test runner as data
+import hmac # Constant-time comparison of the operator token
 # Updated import:
 import questions_data # Custom module to store question data. Use module prefix for clarity
 import sys # For system-specific parameters and functions (e.g., stderr)
-import re # For regular expressions (not explicitly used in this file but might be useful, e.g. for input validation)
+import uuid # For generating stable per-session keys (admission control)
+import datetime # Parsing contest start/end times
+import markupsafe # HTML escaping (flask.escape was removed in Flask 3)
+import click # Arguments for Flask CLI commands
+import admission # Admission control (rate limiting, concurrency cap, coalescing) for /api/evaluate
+import mcq_grading # Precomputed MCQ answer keys for batch / bulk grading
+import python_submission # AST validation and compiled-code cache for Python submissions
+import sql_grading # SQL fixture templates, VM step counting and query plan inspection
+import scoreboard_rollups # Incrementally maintained per-challenge analytics
+import traffic_capture # Optional anonymized request recorder for capacity planning
+import contest # Scheduled contests with server-enforced deadlines
+import request_profiler # Opt-in sampling profiler for slow requests
 
 # Initialize Flask App
 app = Flask(__name__)
@@ -18,6 +31,47 @@ app.secret_key = os.urandom(24) # Secret key for session management; ensure this
 # --- Constants ---
 DATABASE = 'scoreboard.db' # SQLite database file name
 SCHEMA_FILE = 'schema.sql' # SQL schema file name
+SQL_MAX_DISPLAY_ROWS = 50 # Rows of the user's SQL output rendered in the results table
+PYTHON_TIMEOUT_SECONDS = 5 # Default wall-clock limit for one Python grading run
+PYTHON_RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python_runner.py') # Child-process test runner
+
+# Admission control for /api/evaluate (see admission.py).
+# The concurrency cap should match how many grader subprocesses the machine can run at once.
+GRADER_MAX_CONCURRENCY = int(os.environ.get('GRADER_MAX_CONCURRENCY', os.cpu_count() or 2))
+GRADER_MAX_QUEUE = int(os.environ.get('GRADER_MAX_QUEUE', GRADER_MAX_CONCURRENCY * 4)) # Requests allowed to wait for a slot
+GRADER_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('GRADER_QUEUE_TIMEOUT_SECONDS', 10)) # Max wait for a slot before shedding
+EVALUATE_RATE_PER_SECOND = float(os.environ.get('EVALUATE_RATE_PER_SECOND', 0.5)) # Sustained gradings per session
+EVALUATE_BURST = int(os.environ.get('EVALUATE_BURST', 3)) # Quick successive gradings allowed per session
+
+grader_admission = admission.AdmissionController(
+    max_concurrency=GRADER_MAX_CONCURRENCY,
+    max_queue=GRADER_MAX_QUEUE,
+    queue_timeout=GRADER_QUEUE_TIMEOUT_SECONDS,
+    rate=EVALUATE_RATE_PER_SECOND,
+    burst=EVALUATE_BURST,
+)
+
+# Anonymized traffic capture (see traffic_capture.py); replay it with benchmarks/replay_traffic.py
+TRAFFIC_CAPTURE_FILE = os.environ.get('TRAFFIC_CAPTURE_FILE')
+TRAFFIC_CAPTURE_SALT = os.environ.get('TRAFFIC_CAPTURE_SALT') # Required with TRAFFIC_CAPTURE_FILE; the same in all workers
+if TRAFFIC_CAPTURE_FILE:
+    traffic_capture.TrafficRecorder(app, TRAFFIC_CAPTURE_FILE, salt=TRAFFIC_CAPTURE_SALT)
+
+# Opt-in sampling profiler for slow requests (see request_profiler.py); nothing is installed unless
+# PROFILE_DIR is set. Stored profiles are listed at /api/profiles.
+PROFILE_DIR = os.environ.get('PROFILE_DIR')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0)) # Share of requests profiled (0 to 1)
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 500)) # Sampled requests faster than this are not kept
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50)) # Ring buffer size on disk (at least 1)
+# Operator token: enables the X-Profile-Request header, and is required (in that header) by the operator
+# endpoints (/api/profiles, /api/admission_stats, /api/prewarm); those endpoints are disabled while it is unset.
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+
+profiler = None
+if PROFILE_DIR:
+    profiler = request_profiler.RequestProfiler(app, PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE,
+                                                slow_ms=PROFILE_SLOW_MS, max_profiles=PROFILE_MAX_FILES,
+                                                token=PROFILE_TOKEN)
 
 # In-memory dictionary defining available challenges
 # The key is the challenge_id, used internally and in URLs.
@@ -33,6 +87,11 @@ CHALLENGES = {
         "id": "python_basic_problems",
         "name": "Python Basic Problems", # Consider changing to "Python Basic Problems" for better display
         "description": "A collection of python basic and theory questions.", # Updated description
+    },
+    "python_performance": {
+        "id": "python_performance",
+        "name": "Python Performance",
+        "description": "Python problems where correct solutions must also be efficient; they are timed on large inputs.",
     }
     # Add more challenges here if needed, e.g., for mixed types or pure MCQ
     # "mcq_theory": {
@@ -42,6 +101,15 @@ CHALLENGES = {
     # }
 }
 
+# Scheduled contests (see contest.py), keyed by challenge_id. Times are ISO 8601, in server local time
+# unless an offset is given. While a contest is configured, its challenge can only be started between
+# 'start' and 'end', question time limits are enforced by the server, and participants who do not
+# finish get their score recorded at their deadline. 'max_duration_minutes' optionally limits how long
+# each participant may take. Contest state is kept in memory: serve contests from one worker process.
+CONTESTS = {
+    # "sql_basics": {"start": "2026-11-02T09:00:00", "end": "2026-11-02T11:00:00", "max_duration_minutes": 60},
+}
+
 # --- Database Helper Functions ---
 # These functions provide an abstraction layer for interacting with the SQLite database.
 
@@ -109,6 +177,99 @@ def execute_db(query, args=()):
     db.commit()
     cur.close()
 
+def record_scores(rows):
+    """
+    Inserts final scores into the scoreboard and updates the analytics rollups, all in one
+    transaction, so the rollups always match the raw rows.
+    :param rows: List of (username, challenge_id, score, time_taken_seconds) tuples.
+    """
+    db = get_db()
+    scoreboard_rollups.ensure_schema(db)
+    with db: # Commits on success, rolls back on error
+        db.executemany("INSERT INTO scoreboard (username, challenge_id, score, time_taken_seconds) VALUES (?, ?, ?, ?)",
+                       rows)
+        for _, challenge_id, score, time_taken_seconds in rows:
+            scoreboard_rollups.apply_score(db, challenge_id, score, time_taken_seconds)
+
+def record_score(username, challenge_id, score, time_taken_seconds):
+    """Records a single final score (see record_scores)."""
+    record_scores([(username, challenge_id, score, time_taken_seconds)])
+
+def _record_contest_scores(rows):
+    # Called from the contest timer thread, outside any request
+    with app.app_context():
+        record_scores(rows)
+
+def _question_time_limit(question_id):
+    question = questions_data.get_question_by_id(question_id)
+    return question.get('time_limit_seconds') if question else None
+
+def _parse_contest_time(value):
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+contest_scheduler = contest.ContestScheduler(_record_contest_scores, _question_time_limit)
+for _challenge_id, _settings in CONTESTS.items():
+    contest_scheduler.add_contest(contest.Contest(
+        _challenge_id,
+        _parse_contest_time(_settings['start']),
+        _parse_contest_time(_settings['end']),
+        _settings['max_duration_minutes'] * 60 if _settings.get('max_duration_minutes') else None,
+    ))
+
+def _contest_participant():
+    """Returns the contest Participant of the current session, or None outside contests."""
+    return contest_scheduler.participant(session.get('session_key'))
+
+def _current_score(participant):
+    """Returns the score to show: the server-side contest score in contests, else the session's score."""
+    return participant.score if participant else session.get('score', 0)
+
+def _reset_session():
+    """
+    Clears the session except for contest resume tokens ({challenge_id: token}), so a participant
+    who restarts or logs in again in the same browser can still resume their contest attempt.
+    """
+    contest_tokens = session.get('contest_tokens')
+    session.clear()
+    if contest_tokens:
+        session['contest_tokens'] = contest_tokens
+
+def _warm_evaluation_connection(question):
+    # Checking a connection out and back in builds the fixture template and leaves the connection idle in the pool
+    with sql_grading.evaluation_connection(question):
+        pass
+
+def prewarm():
+    """
+    Builds the grading caches that are otherwise created lazily on first use, so the first
+    participants after a (re)start do not pay for them:
+    SQL fixture templates and one pooled evaluation connection per SQL question, reference step
+    counts, Python performance payloads (stress inputs and compiled reference solutions), MCQ
+    answer keys, and the analytics rollup tables.
+    Safe to call repeatedly; already built caches are reused.
+    :return: Dictionary of subsystem name -> seconds spent warming it.
+    """
+    timings = {}
+
+    def timed(name, func):
+        start = time.perf_counter()
+        func()
+        timings[name] = round(timings.get(name, 0) + time.perf_counter() - start, 4)
+
+    for question in questions_data.QUESTIONS:
+        if question['language'] == 'sql':
+            timed('sql_connection_pool', lambda: _warm_evaluation_connection(question))
+            if question.get('performance'):
+                timed('sql_reference_steps', lambda: sql_grading.step_budget(question))
+        elif question['language'] == 'python' and question.get('performance'):
+            timed('python_performance', lambda: python_submission.performance_payload(question))
+    for challenge_id in CHALLENGES:
+        timed('mcq_answer_keys', lambda: mcq_grading.get_answer_key(challenge_id))
+    if os.path.exists(DATABASE): # The scoreboard database may not be initialized yet
+        with app.app_context():
+            timed('rollup_schema', lambda: scoreboard_rollups.ensure_schema(get_db()))
+    return timings
+
 # Helper function to generate QNP data
 def _get_qnp_data(session_question_ids, session_answers):
     qnp_data = []
@@ -143,9 +304,10 @@ def index():
             return render_template('index.html', challenges=CHALLENGES)
         
         # Initialize session for the new test
-        session.clear() # Clear any previous session data
+        _reset_session() # Clear any previous session data
         session['username'] = username.strip()
         session['challenge_id'] = challenge_id
+        session['session_key'] = uuid.uuid4().hex # Identifies this test session for rate limiting
         session['current_question_idx'] = 0 # Start with the first question
         session['score'] = 0
         session['start_time'] = time.time() # Overall test start time
@@ -158,11 +320,28 @@ def index():
         # Check if the selected challenge has any questions
         if not session['question_ids']:
             flask.flash(f"No questions found for challenge '{CHALLENGES[challenge_id]['name']}'. Please select another.", "warning")
-            session.clear() # Ensure session is cleared if no questions
+            _reset_session() # Ensure session is cleared if no questions
             return render_template('index.html', challenges=CHALLENGES)
 
         # Initialize answers status for QNP: keys are stringified question IDs
         session['answers'] = {str(qid): {"status": "unattempted", "attempt_detail": None} for qid in session['question_ids']}
+
+        # Challenges with a scheduled contest can only be taken while it runs, once per username
+        if contest_scheduler.contest_for(challenge_id):
+            contest_tokens = session.get('contest_tokens', {})
+            try:
+                participant, resumed = contest_scheduler.join(challenge_id, session['session_key'], session['username'],
+                                                              resume_token=contest_tokens.get(challenge_id))
+            except contest.ContestClosed as closed:
+                _reset_session() # Before flashing: flashed messages are stored in the session
+                flask.flash(str(closed), "error")
+                return render_template('index.html', challenges=CHALLENGES)
+            session['contest_tokens'] = {**contest_tokens, challenge_id: participant.resume_token}
+            if resumed: # Logging in again continues the same attempt, with its clock and solved questions
+                session['start_time'] = participant.joined_at
+                session['score'] = participant.score
+                for solved_id in participant.solved:
+                    session['answers'][str(solved_id)] = {"status": "correct", "attempt_detail": None}
         
         return redirect(url_for('test_page')) # Redirect to the test interface
     
@@ -213,11 +392,22 @@ def get_current_question_api():
     # Prepare QNP data based on current answers in session
     qnp_data = _get_qnp_data(session.get('question_ids', []), session.get('answers', {}))
 
+    # Contest participants whose time is over only see the completion screen
+    participant = _contest_participant()
+    if participant and participant.done:
+        return jsonify({
+            "test_completed": True,
+            "score": participant.score,
+            "qnp_data": qnp_data,
+            "challenge_id": challenge_id,
+            "message": "Your contest time is over."
+        })
+
     # Check if all questions have been answered or no questions
     if not question_ids or (current_idx >= len(question_ids) > 0) :
         return jsonify({
             "test_completed": True, 
-            "score": session.get('score', 0),
+            "score": _current_score(participant),
             "qnp_data": qnp_data, # Still send QNP data for final state display
             "message": "No questions in this challenge." if not question_ids else "Test completed."
         })
@@ -252,10 +442,15 @@ def get_current_question_api():
     
     client_question['current_q_num'] = current_idx + 1
     client_question['total_questions'] = len(question_ids)
-    client_question['user_score'] = session.get('score', 0)
+    client_question['user_score'] = _current_score(participant)
     client_question['challenge_name'] = CHALLENGES.get(challenge_id, {}).get('name', "Unknown Challenge")
     client_question['qnp_data'] = qnp_data # Add QNP data to response
 
+    if participant:
+        # Server-side clocks: the question's clock keeps running from when it was first shown
+        client_question['question_elapsed_seconds'] = round(contest_scheduler.open_question(participant, q_id))
+        client_question['contest_time_remaining_seconds'] = max(0, round(participant.deadline - time.time()))
+
     return jsonify(client_question)
 
 @app.route('/api/evaluate', methods=['POST'])
@@ -279,6 +474,13 @@ def evaluate_code_api():
     question = questions_data.get_question_by_id(int(q_id))
     if not question or question.get('challenge_id') != challenge_id:
         return jsonify({"error": "Invalid question_id or not part of this challenge"}), 400
+
+    participant = _contest_participant()
+    if participant:
+        try:
+            contest_scheduler.check_submission(participant, question['id'])
+        except contest.ContestClosed as closed:
+            return jsonify({"error": str(closed), "reason": "deadline"}), 403
     
     # Prevent re-evaluation/scoring if already answered correctly
     # For MCQs, once answered, it's final (correct or incorrect) for QNP status, but allow re-submission view
@@ -290,17 +492,36 @@ def evaluate_code_api():
             "message": "You have already answered this question correctly.",
             "output": current_answer_info.get('attempt_detail', ''), # Show previous correct output/detail
             "qnp_data": updated_qnp_data,
-            "new_score": session.get('score')
+            "new_score": _current_score(participant)
         })
 
-    result = {"status": "error", "output": "Evaluation failed.", "passed_all_tests": False}
+    def grade():
+        if question['language'] == 'sql':
+            return evaluate_sql(user_submission, question)
+        elif question['language'] == 'python':
+            return evaluate_python(user_submission, question)
+        elif question['language'] == 'mcq':
+            return evaluate_mcq(user_submission, question)
+        return {"status": "error", "output": "Evaluation failed.", "passed_all_tests": False}
 
-    if question['language'] == 'sql':
-        result = evaluate_sql(user_submission, question)
-    elif question['language'] == 'python':
-        result = evaluate_python(user_submission, question)
-    elif question['language'] == 'mcq':
-        result = evaluate_mcq(user_submission, question)
+    # Sessions created before admission control was introduced get a key lazily
+    if 'session_key' not in session:
+        session['session_key'] = uuid.uuid4().hex
+
+    try:
+        result, coalesced = grader_admission.run(session['session_key'], q_id_str, user_submission, grade)
+    except admission.AdmissionRejected as rejected:
+        if rejected.reason == "rate_limited":
+            message, status_code = "Too many submissions. Please wait before running again.", 429
+        else:
+            message, status_code = "The grader is busy. Please try again shortly.", 503
+        response = jsonify({"error": message, "reason": rejected.reason, "retry_after": rejected.retry_after})
+        response.headers['Retry-After'] = str(rejected.retry_after)
+        return response, status_code
+    # Coalesced requests share one result dict; copy it before adding per-request fields
+    result = dict(result)
+    if coalesced:
+        result['coalesced'] = True
     
     # Update score and session answers based on evaluation
     if result.get('passed_all_tests'):
@@ -317,6 +538,11 @@ def evaluate_code_api():
               # This behavior can be debated. Current QNP shows first correct state.
               result['message'] = "Evaluated, but score retained from first correct answer."
 
+    if participant and result.get('passed_all_tests'):
+        # The contest score is kept server-side and credits each question once
+        contest_scheduler.record_correct(participant, question['id'], question['points'])
+        session['score'] = result['new_score'] = participant.score
+
     # Prepare updated QNP data to send back for immediate UI update
     result['qnp_data'] = _get_qnp_data(session.get('question_ids', []), session.get('answers', {}))
     
@@ -339,97 +565,206 @@ def evaluate_mcq(selected_option_index_str, question_data):
         }
 
     is_correct = (selected_index == question_data['correct_answer_index'])
-    output_html = ""
-
-    if is_correct:
-        output_html = f"<p class='text-success mt-2'><strong>Status: Correct!</strong></p>"
-    else:
-        correct_option_text = "N/A"
-        if 0 <= question_data['correct_answer_index'] < len(question_data['options']):
-             correct_option_text = question_data['options'][question_data['correct_answer_index']]
-        output_html = f"<p class='text-danger mt-2'><strong>Status: Incorrect.</strong></p>"
-        output_html += f"<p>The correct answer was: '{flask.escape(correct_option_text)}'</p>"
-        
     return {
         "status": "correct" if is_correct else "incorrect",
-        "output": output_html,
+        "output": _mcq_output_html(is_correct, question_data),
         "passed_all_tests": is_correct
     }
 
+def _mcq_output_html(is_correct, question_data):
+    """
+    Builds the HTML verdict shown to the user for an MCQ answer.
+    Shared by single-answer grading and batch (whole-sheet) grading.
+    """
+    if is_correct:
+        return f"<p class='text-success mt-2'><strong>Status: Correct!</strong></p>"
+    correct_option_text = "N/A"
+    if 0 <= question_data['correct_answer_index'] < len(question_data['options']):
+         correct_option_text = question_data['options'][question_data['correct_answer_index']]
+    output_html = f"<p class='text-danger mt-2'><strong>Status: Incorrect.</strong></p>"
+    output_html += f"<p>The correct answer was: '{markupsafe.escape(correct_option_text)}'</p>"
+    return output_html
+
 def evaluate_sql(user_query, question_data):
     """
     Evaluates a user's SQL query.
-    It sets up an in-memory SQLite database, applies the question's schema,
-    runs the user's query and the expected query, then compares results.
+    It checks out a pooled in-memory copy of the question's schema and fixture data (see sql_grading.py),
+    runs the user's query and the expected query inside a transaction that is always rolled back,
+    then compares results.
+    For performance-graded questions (a "performance" block in the question), it also counts the
+    SQLite VM steps of the user's query and inspects its EXPLAIN QUERY PLAN; the query must then
+    also stay within the step budget and avoid full scans of the listed tables.
     :param user_query: The SQL query submitted by the user.
     :param question_data: The dictionary containing question details (schema, expected_query_output).
-    :return: A dictionary with evaluation status, HTML output, and error messages.
+    :return: A dictionary with evaluation status, HTML output, error messages and efficiency metrics.
     """
-    db_eval = sqlite3.connect(':memory:') # Use an in-memory database for evaluation
-    cursor_eval = db_eval.cursor()
+    performance = question_data.get('performance')
     output_html = "" # To build HTML representation of results
     is_correct = False
     error_message = None
+    metrics = None
 
+    # Pooled in-memory copy of the question's database; all changes are rolled back afterwards
     try:
-        # Apply schema if provided for the question
-        if question_data.get('schema'):
-            cursor_eval.executescript(question_data['schema'])
-        
-        # Execute user's query
-        cursor_eval.execute(user_query)
-        user_results_raw = cursor_eval.fetchall()
-        user_cols = [desc[0] for desc in cursor_eval.description] if cursor_eval.description else []
-        
-        # Execute expected (correct) query
-        cursor_eval.execute(question_data['expected_query_output'])
-        expected_results_raw = cursor_eval.fetchall()
-        expected_cols = [desc[0] for desc in cursor_eval.description] if cursor_eval.description else []
-
-        # Format user's output as HTML table
-        output_html += "<h4>Your Output:</h4>"
-        if user_results_raw:
-            output_html += "<table class='results-table'><thead><tr>"
-            for col in user_cols:
-                output_html += f"<th>{col}</th>"
-            output_html += "</tr></thead><tbody>"
-            for row in user_results_raw:
-                output_html += "<tr>"
-                for val in row:
-                    output_html += f"<td>{val}</td>"
-                output_html += "</tr>"
-            output_html += "</tbody></table>"
-        else:
-            output_html += "<p>Your query returned no results.</p>"
-        
-        # Compare column names and row data for correctness
-        if user_cols == expected_cols and user_results_raw == expected_results_raw:
-            is_correct = True
-            output_html += "<p class='text-success mt-2'><strong>Status: Correct!</strong></p>"
-        else:
-            output_html += "<p class='text-danger mt-2'><strong>Status: Incorrect.</strong></p>"
-            # Optionally, for debugging, one might add expected output here,
-            # but typically not shown to users in a test environment.
-
-    except sqlite3.Error as e:
+        with sql_grading.evaluation_connection(question_data) as db_eval:
+            cursor_eval = db_eval.cursor()
+            step_budget = sql_grading.step_budget(question_data) if performance else None
+            step_limit = sql_grading.hard_step_limit(step_budget) if performance else None
+
+            # Indexing questions may let the user create indexes before the graded query
+            setup_statements, graded_query = sql_grading.split_setup(
+                user_query, performance and performance.get('allow_index_creation'))
+            for statement in setup_statements:
+                cursor_eval.execute(statement)
+
+            # Execute user's query, counting VM steps
+            user_results_raw, user_cols, user_steps = sql_grading.run_query(db_eval, graded_query, step_limit)
+            plan = sql_grading.query_plan(db_eval, graded_query) if user_cols else None
+
+            # Execute expected (correct) query
+            cursor_eval.execute(question_data['expected_query_output'])
+            expected_results_raw = cursor_eval.fetchall()
+            expected_cols = [desc[0] for desc in cursor_eval.description] if cursor_eval.description else []
+
+            # Format user's output as HTML table (large fixtures can return many rows, so cap the display)
+            output_html += "<h4>Your Output:</h4>"
+            if user_results_raw:
+                output_html += "<table class='results-table'><thead><tr>"
+                for col in user_cols:
+                    output_html += f"<th>{markupsafe.escape(col)}</th>"
+                output_html += "</tr></thead><tbody>"
+                for row in user_results_raw[:SQL_MAX_DISPLAY_ROWS]:
+                    output_html += "<tr>"
+                    for val in row:
+                        output_html += f"<td>{markupsafe.escape(val)}</td>"
+                    output_html += "</tr>"
+                output_html += "</tbody></table>"
+                if len(user_results_raw) > SQL_MAX_DISPLAY_ROWS:
+                    output_html += f"<p class='text-muted'>Showing {SQL_MAX_DISPLAY_ROWS} of {len(user_results_raw)} rows.</p>"
+            else:
+                output_html += "<p>Your query returned no results.</p>"
+
+            # Compare column names and row data for correctness
+            is_correct = user_cols == expected_cols and user_results_raw == expected_results_raw
+
+            if performance:
+                # query_plan maps aliases back to table names; compare case-insensitively, like SQLite does
+                forbidden = {table.casefold() for table in performance.get('forbid_full_scan', [])}
+                forbidden_scans = sorted({table for table in (plan['scans'] if plan else []) if table.casefold() in forbidden})
+                metrics = {
+                    "vm_steps": user_steps,
+                    "vm_step_budget": step_budget,
+                    "full_scans": plan['scans'] if plan else [],
+                    "index_lookups": plan['index_lookups'] if plan else [],
+                    "query_plan": plan['details'] if plan else [],
+                }
+                output_html += "<h5 class='mt-3'>Efficiency</h5><ul class='list-group'>"
+                within_budget = user_steps <= step_budget
+                output_html += f"<li class='list-group-item'>{'✅' if within_budget else '❌'} VM steps: about {user_steps:,} (budget {step_budget:,})</li>"
+                if performance.get('forbid_full_scan'):
+                    scan_note = f"Full scan of {', '.join(forbidden_scans)}" if forbidden_scans else "No full scans of large tables"
+                    output_html += f"<li class='list-group-item'>{'❌' if forbidden_scans else '✅'} {markupsafe.escape(scan_note)}</li>"
+                output_html += "<li class='list-group-item'><small>Query plan:<br><code>" + "<br>".join(markupsafe.escape(d) for d in metrics['query_plan']) + "</code></small></li>"
+                output_html += "</ul>"
+                is_correct = is_correct and within_budget and not forbidden_scans
+
+            if is_correct:
+                output_html += "<p class='text-success mt-2'><strong>Status: Correct!</strong></p>"
+            else:
+                output_html += "<p class='text-danger mt-2'><strong>Status: Incorrect.</strong></p>"
+                # Optionally, for debugging, one might add expected output here,
+                # but typically not shown to users in a test environment.
+
+    except sql_grading.StepLimitExceeded as e:
+        error_message = str(e)
+        output_html += f"<p class='text-danger'><strong>Error:</strong> {e} Your query does far more work than needed.</p>"
+    except (sqlite3.Error, ValueError) as e:
         error_message = f"SQL Error: {e}"
-        output_html += f"<p class='text-danger'><strong>Error:</strong> {e}</p>"
-    finally:
-        db_eval.close() # Ensure the in-memory database is closed
+        output_html += f"<p class='text-danger'><strong>Error:</strong> {markupsafe.escape(e)}</p>"
 
-    return {
+    result = {
         "status": "correct" if is_correct else "incorrect",
         "output": output_html,
         "error": error_message, # SQL execution error, if any
         "passed_all_tests": is_correct # For SQL, "correct" means all tests (i.e., data match) passed
     }
+    if metrics is not None:
+        result["metrics"] = metrics # Efficiency metrics of performance-graded questions
+    return result
 
 
+def _preview(value, limit=200):
+    """
+    Returns an HTML-escaped, length-limited repr of a value for display in test results.
+    Keeps the response small when test inputs or outputs are large.
+    """
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) > limit:
+        text = text[:limit] + "..."
+    return markupsafe.escape(text)
+
+def _format_seconds(seconds):
+    """Formats a measured duration for display in test results (None if it was not measured)."""
+    if seconds is None:
+        return "n/a"
+    return f"{seconds * 1000:.1f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+def _run_python_runner(payload, timeout_seconds):
+    """
+    Runs python_runner.py in a subprocess with a pickled payload on stdin.
+    Results come back over a separate file descriptor, never stdout (see python_runner.py).
+    Timeout is crucial for preventing infinite loops or very long computations.
+    Resource limits (memory, CPU) are harder to enforce cross-platform without extra libraries or Docker.
+    :return: A tuple (return code, raw JSON results, stderr text).
+    :raises subprocess.TimeoutExpired: If the runner takes longer than `timeout_seconds`.
+    """
+    with tempfile.TemporaryFile() as results_file:
+        results_fd = results_file.fileno()
+        process = subprocess.run(
+            [sys.executable, PYTHON_RUNNER, str(results_fd)],  # Same interpreter as the Flask app
+            input=pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL),  # Test cases travel as data over stdin
+            stdout=subprocess.DEVNULL,  # The runner never reports through stdout
+            stderr=subprocess.PIPE,  # Tracebacks of code that fails to load
+            pass_fds=(results_fd,),  # Results channel
+            timeout=timeout_seconds
+        )
+        results_file.seek(0)
+        raw_results = results_file.read().decode('utf-8', errors='replace')
+    return process.returncode, raw_results, process.stderr.decode('utf-8', errors='replace')
+
+def _time_reference_solution(performance, func_name, timeout_seconds):
+    """
+    Times a performance-graded question's reference solution on its stress inputs, in a runner
+    process of its own (reference mode) that never loads user code.
+    :return: List of lists of seconds, one list per stress input.
+    :raises ValueError: If the reference run fails or reports malformed timings.
+    """
+    returncode, raw_results, stderr = _run_python_runner({
+        "mode": "reference",
+        "bytecode": performance["reference_bytecode"],
+        "func_name": func_name,
+        "stress_inputs": performance["stress_inputs"],
+        "repeats": performance["repeats"],
+    }, timeout_seconds)
+    if returncode != 0:
+        raise ValueError(f"reference runner exited with code {returncode}: {stderr}")
+    reference_times = json.loads(raw_results)["reference_seconds"]
+    if len(reference_times) != len(performance["stress_inputs"]) or not all(reference_times):
+        raise ValueError("reference runner reported incomplete timings")
+    return reference_times
+
 def evaluate_python(user_code, question_data):
     """
     Evaluates a user's Python code by running it against predefined test cases.
-    Writes the user's code and a test harness to a temporary file,
-    then executes it using a subprocess with a timeout.
+    The code is first parsed and compiled via python_submission (which checks that the question's
+    declared entry point exists and spots loops that never end; those are shown as warnings).
+    Starts the fixed test runner (python_runner.py) in a subprocess with a timeout and sends it
+    the compiled code and the test cases as pickled data over stdin, so no source code is generated
+    from test data and harness overhead stays constant regardless of test size.
+    The runner writes its results to a separate file descriptor, never to stdout, and results that
+    do not cover every test case (e.g. the user's code exited early) fail the submission.
+    For performance-graded questions, the reference solution is first timed in a separate runner
+    process; the resulting budgets are sent to the user's run, and the verdicts are decided here.
     :param user_code: The Python code submitted by the user.
     :param question_data: Dictionary with question details, including 'test_cases'.
     :return: A dictionary with evaluation status, HTML output of test results, and overall success.
@@ -437,101 +772,124 @@ def evaluate_python(user_code, question_data):
     results_html = ""  # HTML representation of test case results
     all_tests_passed = True  # Flag to track if all test cases pass
     overall_status_message = ""
+    test_cases = question_data["test_cases"]
 
-    # Create a temporary file for the user's code + test harness.
-    # This provides a basic form of isolation. More advanced sandboxing would use Docker or similar.
-    with tempfile.NamedTemporaryFile(mode="w+", suffix=".py", delete=False) as tmp_code_file:
-        # Write necessary imports (if any specific are allowed/needed by the harness)
-        tmp_code_file.write("import sys\n")
-        tmp_code_file.write("import json\n\n")
-
-        # Write the user's code
-        tmp_code_file.write(user_code + "\n\n")
-
-        # Dynamically generate and write the test harness code
-        # This harness will call the user's function with test case inputs
-        # and capture results, then print them as JSON.
-        harness_code = "def run_tests():\n"
-        harness_code += "    results = []\n"
-        # Attempt to extract the function name from the user's code (simplistic extraction)
-        # Assumes standard `def function_name(...):` format.
-        # More robust parsing might be needed for complex scenarios.
-        match = re.search(r"def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(", user_code)
-        if not match:  # Fallback or error if function name cannot be determined
-            # This situation should ideally be handled more gracefully,
-            # e.g., by returning an error to the user.
-            # For now, it might lead to runtime errors in the subprocess.
-            func_name = "user_function"  # Placeholder, likely to fail if user named it differently
-        else:
-            func_name = match.group(1)
-
-        for i, test_case in enumerate(question_data["test_cases"]):
-            input_args_str = ", ".join(map(repr, test_case["input_args"]))  # Format input arguments for the call
-            harness_code += f"    try:\n"
-            # Call the extracted function name with the test case's input arguments
-            harness_code += f"        actual = {func_name}({input_args_str})\n"
-            # Compare actual output with expected output
-            harness_code += f"        passed_check = actual == {repr(test_case['expected_output'])}\n"
-            harness_code += f"        results.append({{'name': '{test_case.get('name', f'Test {i + 1}')}', 'input': {test_case['input_args']}, 'expected': {repr(test_case['expected_output'])}, 'actual': actual, 'passed': passed_check, 'error': None}})\n"
-            harness_code += f"    except Exception as e_test:\n"  # Catch errors during test execution
-            harness_code += f"        results.append({{'name': '{test_case.get('name', f'Test {i + 1}')}', 'input': {test_case['input_args']}, 'expected': {repr(test_case['expected_output'])}, 'actual': None, 'passed': False, 'error': str(e_test)}})\n"
-
-        harness_code += "    print(json.dumps(results))\n\n"  # Output results as JSON string
-        harness_code += "run_tests()\n"  # Execute the test runner function
-
-        tmp_code_file.write(harness_code)
-        tmp_file_name = tmp_code_file.name  # Get the name of the temporary file
-
-    python_executable = sys.executable  # Use the same Python interpreter that runs the Flask app
+    # Parse, validate and compile once (cached by source hash) before starting a subprocess
     try:
-        # Execute the temporary file in a subprocess
-        # Timeout is crucial for preventing infinite loops or very long computations.
-        # Resource limits (memory, CPU) are harder to enforce cross-platform without extra libraries or Docker.
-        process = subprocess.run(
-            [python_executable, tmp_file_name],
-            capture_output=True,  # Capture stdout and stderr
-            text=True,  # Decode output as text
-            timeout=5  # 5-second timeout for execution
-        )
+        func_name = python_submission.entry_point_for(question_data)
+        performance = python_submission.performance_payload(question_data) # None unless performance-graded
+    except ValueError as e: # The question definition is broken, not the submission
+        print(f"Question configuration error: {e}", file=sys.stderr)
+        return {
+            "status": "error",
+            "output": "<p class='text-danger'>This question is misconfigured and cannot be graded. Please notify the organizers.</p>",
+            "passed_all_tests": False
+        }
+    submission = python_submission.prepare(user_code)
+    rejection = submission.check_entry_point(func_name)
+    if rejection:
+        return {
+            "status": "failed_tests",
+            "output": f"<p class='text-danger mt-2'><strong>Some tests failed.</strong></p><p class='text-danger'>{markupsafe.escape(rejection)}</p>",
+            "passed_all_tests": False
+        }
+    warnings_html = "".join(f"<p class='text-warning'>Warning: {markupsafe.escape(w)}</p>" for w in submission.warnings)
+    # Performance-graded questions run stress inputs several times and may allow a longer timeout
+    timeout_seconds = (question_data.get('performance') or {}).get('timeout_seconds', PYTHON_TIMEOUT_SECONDS)
+
+    performance_run = None
+    if performance:
+        # Budgets come from timing the reference solution in its own process, which never loads the
+        # user's code, so a submission cannot slow the reference down to raise its own budget
+        try:
+            reference_times = _time_reference_solution(performance, func_name, timeout_seconds)
+        except (ValueError, KeyError, TypeError, subprocess.TimeoutExpired) as e:
+            print(f"Reference timing failed for question {question_data['id']}: {e!r}", file=sys.stderr)
+            return {
+                "status": "error",
+                "output": "<p class='text-danger'>The reference solution of this question could not be timed. Please try again, or notify the organizers if this persists.</p>",
+                "passed_all_tests": False
+            }
+        budgets = [python_submission.time_budget(times, performance) for times in reference_times]
+        performance_run = {
+            "stress_inputs": performance["stress_inputs"],
+            "expected_outputs": performance["expected_outputs"],
+            "budgets": budgets,
+            "repeats": performance["repeats"],
+        }
 
-        if process.returncode == 0:  # Successful execution of the script
+    try:
+        returncode, raw_results, stderr = _run_python_runner({
+            "bytecode": submission.bytecode,
+            "func_name": func_name,
+            "test_cases": [(tc["input_args"], tc["expected_output"]) for tc in test_cases],
+            "performance": performance_run,
+        }, timeout_seconds)
+
+        if returncode == 0:  # Successful execution of the runner
             try:
-                test_results = json.loads(process.stdout)  # Parse JSON output from the harness
+                runner_output = json.loads(raw_results)
+                test_results = runner_output["tests"]  # One result per test case, in order
+                performance_results = runner_output["performance"]
+                # Every test case needs a result: a shorter list would silently skip the missing cases
+                expected_stress_runs = len(performance["stress_inputs"]) if performance else 0
+                if len(test_results) != len(test_cases) or len(performance_results) not in (0, expected_stress_runs):
+                    raise ValueError("incomplete results")
                 results_html += "<ul class='list-group'>"
-                for res in test_results:
+                for i, (test_case, res) in enumerate(zip(test_cases, test_results)):
+                    name = test_case.get('name', f'Test {i + 1}')
                     status_icon = "✅" if res['passed'] else "❌"
                     status_class = "text-success" if res['passed'] else "text-danger"
                     results_html += f"<li class='list-group-item'>"
-                    results_html += f"<strong>{res['name']}:</strong> {status_icon} <span class='{status_class}'>"
+                    results_html += f"<strong>{markupsafe.escape(name)}:</strong> {status_icon} <span class='{status_class}'>"
                     results_html += "Passed" if res['passed'] else "Failed"
                     results_html += "</span><br>"
-                    results_html += f"<small>Input: <code>{res['input']}</code>, Expected: <code>{res['expected']}</code>, Got: <code>{res['actual'] if not res['error'] else 'Error'}</code></small>"
+                    results_html += f"<small>Input: <code>{_preview(test_case['input_args'])}</code>, Expected: <code>{_preview(test_case['expected_output'])}</code>, Got: <code>{_preview(res['actual']) if not res['error'] else 'Error'}</code>, Time: {_format_seconds(res['seconds'])}</small>"
                     if res['error']:
-                        results_html += f"<br><small class='text-danger'>Error during this test: {res['error']}</small>"
+                        results_html += f"<br><small class='text-danger'>Error during this test: {markupsafe.escape(res['error'])}</small>"
                     results_html += "</li>"
                     if not res['passed']:
                         all_tests_passed = False
                 results_html += "</ul>"
 
-            except json.JSONDecodeError:
-                results_html = "<p class='text-danger'>Error: Could not parse test output from script.</p>"
-                results_html += f"<pre>Script STDOUT:\n{process.stdout}</pre>"  # Show raw output for debugging
+                # Stress tests of performance-graded questions (only run once all regular tests pass)
+                if performance and all_tests_passed and not performance_results:
+                    raise ValueError("missing performance results")
+                if performance_results:
+                    results_html += "<h5 class='mt-3'>Performance</h5><ul class='list-group'>"
+                    for i, res in enumerate(performance_results):
+                        # The verdict is decided here, from the budget computed in this process
+                        passed = res['error'] is None and res['seconds'] is not None and res['seconds'] <= budgets[i]
+                        status_icon = "✅" if passed else "❌"
+                        status_class = "text-success" if passed else "text-danger"
+                        results_html += f"<li class='list-group-item'><strong>Stress test {i + 1}:</strong> {status_icon} <span class='{status_class}'>"
+                        results_html += "Within time budget" if passed else "Failed"
+                        results_html += "</span><br>"
+                        results_html += f"<small>Your time: {_format_seconds(res['seconds'])}, Reference: {_format_seconds(min(reference_times[i]))}, Budget: {_format_seconds(budgets[i])}</small>"
+                        if res['error']:
+                            results_html += f"<br><small class='text-danger'>{markupsafe.escape(res['error'])}</small>"
+                        results_html += "</li>"
+                        if not passed:
+                            all_tests_passed = False
+                    results_html += "</ul>"
+                elif question_data.get('performance') and not all_tests_passed:
+                    results_html += "<p class='text-muted mt-2'>Performance tests run once all test cases pass.</p>"
+
+            except (ValueError, KeyError, TypeError): # Includes json.JSONDecodeError
+                # Missing, malformed or incomplete results, e.g. the user's code exited before the runner finished
+                results_html = "<p class='text-danger'>Error: The test run did not report a result for every test case. Does your code exit early?</p>"
                 all_tests_passed = False
-        else:  # Script execution failed (non-zero return code)
-            results_html = f"<p class='text-danger'>Error during code execution (Return Code: {process.returncode}):</p>"
-            # Show stderr if available, otherwise stdout, for error diagnosis
-            error_output = process.stderr if process.stderr else process.stdout
-            results_html += f"<pre>{error_output}</pre>"
+        else:  # Runner failed (non-zero return code), e.g. the user's code does not load
+            results_html = f"<p class='text-danger'>Error during code execution (Return Code: {returncode}):</p>"
+            results_html += f"<pre>{markupsafe.escape(stderr)}</pre>"
             all_tests_passed = False
 
     except subprocess.TimeoutExpired:
-        results_html = "<p class='text-danger'>Error: Code execution timed out (max 5 seconds).</p>"
+        results_html = f"<p class='text-danger'>Error: Code execution timed out (max {timeout_seconds} seconds).</p>"
         all_tests_passed = False
     except Exception as e_outer:  # Catch other potential errors in this evaluation function
         results_html = f"<p class='text-danger'>An unexpected error occurred during evaluation: {e_outer}</p>"
         all_tests_passed = False
-    finally:
-        os.remove(tmp_file_name)  # Clean up (delete) the temporary file
 
     # Set overall status message based on test results
     if all_tests_passed:
@@ -541,10 +899,168 @@ def evaluate_python(user_code, question_data):
 
     return {
         "status": "success" if all_tests_passed else "failed_tests",
-        "output": overall_status_message + results_html,  # Combine status message and detailed results
+        "output": overall_status_message + warnings_html + results_html,  # Status, warnings and detailed results
         "passed_all_tests": all_tests_passed
     }
 
+@app.route('/api/evaluate_mcq_batch', methods=['POST'])
+def evaluate_mcq_batch_api():
+    """
+    API endpoint to grade a whole MCQ answer sheet in one request.
+    Expects JSON: {"answers": {"<question_id>": <selected_option_index>, ...}}.
+    Answers are graded in one pass against the challenge's precomputed answer key,
+    and the session (score and QNP statuses) is updated once for the whole sheet.
+    An answer that is not one of the options is graded as incorrect, as in evaluate_mcq.
+    The test page submits single MCQ answers through this endpoint: they need no grader
+    subprocess, so they bypass the admission queue of /api/evaluate.
+    """
+    if 'username' not in session or 'challenge_id' not in session:
+        return jsonify({"error": "Not authenticated or challenge not selected"}), 401
+
+    data = request.get_json(silent=True) or {}
+    answers = data.get('answers')
+    if not isinstance(answers, dict) or not answers:
+        return jsonify({"error": "Missing answers"}), 400
+
+    # In contests, drop answers to questions whose time limit has expired
+    participant = _contest_participant()
+    expired = []
+    if participant:
+        try:
+            contest_scheduler.check_active(participant)
+        except contest.ContestClosed as closed:
+            return jsonify({"error": str(closed), "reason": "deadline"}), 403
+        for q_id in list(answers):
+            try:
+                contest_scheduler.check_submission(participant, int(q_id))
+            except (TypeError, ValueError):
+                continue # Invalid ids are ignored by the answer key
+            except contest.ContestClosed:
+                expired.append(q_id)
+                del answers[q_id]
+
+    answer_key = mcq_grading.get_answer_key(session['challenge_id'])
+    graded = answer_key.grade_sheet(answers)
+
+    # Work on a copy so the session is written back exactly once
+    session_answers = dict(session.get('answers', {}))
+    score = session.get('score', 0)
+    results = {}
+    for q_id, selected, is_correct in graded:
+        q_id_str = str(q_id)
+        question = questions_data.get_question_by_id(q_id)
+        previous_status = session_answers.get(q_id_str, {}).get('status')
+        output_html = _mcq_output_html(is_correct, question)
+        if is_correct:
+            if previous_status != 'correct': # Only add points if not previously correct
+                score += question['points']
+            session_answers[q_id_str] = {"status": "correct", "attempt_detail": output_html}
+        elif previous_status != 'correct': # Keep the first correct answer, as in evaluate_code_api
+            session_answers[q_id_str] = {"status": "incorrect", "attempt_detail": output_html}
+        results[q_id_str] = {
+            "status": "correct" if is_correct else "incorrect",
+            "output": output_html,
+            "passed_all_tests": is_correct
+        }
+
+    if participant:
+        for q_id, _, is_correct in graded:
+            if is_correct:
+                contest_scheduler.record_correct(participant, q_id, questions_data.get_question_by_id(q_id)['points'])
+        score = participant.score
+
+    session['answers'] = session_answers
+    session['score'] = score
+
+    return jsonify({
+        "results": results,
+        "graded": len(results),
+        "ignored": len(answers) - len(results), # Unknown question ids or skipped (null) answers
+        "expired": expired, # Contest questions whose time limit had passed
+        "new_score": score,
+        "qnp_data": _get_qnp_data(session.get('question_ids', []), session_answers)
+    })
+
+def _operator_access_error():
+    """
+    Checks the operator token (PROFILE_TOKEN, sent in the X-Profile-Request header) of an operator endpoint.
+    :return: An error response, or None if the request may proceed.
+    """
+    if PROFILE_TOKEN is None:
+        return jsonify({"error": "Operator endpoints are disabled (set PROFILE_TOKEN)."}), 404
+    if not hmac.compare_digest(request.headers.get(request_profiler.PROFILE_HEADER, ''), PROFILE_TOKEN):
+        return jsonify({"error": f"Missing or invalid {request_profiler.PROFILE_HEADER} header."}), 403
+    return None
+
+@app.route('/api/prewarm', methods=['POST'])
+def prewarm_api():
+    """
+    API endpoint that builds all lazily created grading caches (see prewarm()).
+    Intended for deployment hooks / readiness probes after a restart; calling it again is cheap.
+    Requires the operator token, since warming does real grading work.
+    """
+    error = _operator_access_error()
+    if error:
+        return error
+    start = time.perf_counter()
+    timings = prewarm()
+    return jsonify({"warmed": True, "seconds": round(time.perf_counter() - start, 4), "subsystems": timings})
+
+@app.route('/api/admission_stats', methods=['GET'])
+def admission_stats_api():
+    """
+    API endpoint exposing grader admission metrics for this worker process:
+    queue depth, running gradings, and admitted/coalesced/rejected counters,
+    plus usage of the pooled SQL evaluation connections. Requires the operator token.
+    """
+    error = _operator_access_error()
+    if error:
+        return error
+    return jsonify({**grader_admission.stats(), "sql_connection_pool": sql_grading.pool_stats()})
+
+@app.route('/api/contests', methods=['GET'])
+def contests_api():
+    """
+    API endpoint listing scheduled contests with their status (scheduled/running/ended),
+    participant counts and finalization counters for this worker process.
+    """
+    return jsonify(contest_scheduler.stats())
+
+def _profiles_access_error():
+    # Profile listing is only available when profiling is enabled with a token, and requires that token
+    # (profiles expose code paths and timings, so they are never served anonymously)
+    if profiler is None or profiler.token is None:
+        return jsonify({"error": "Profile listing is not enabled (set PROFILE_DIR and PROFILE_TOKEN)."}), 404
+    if not profiler.is_authorized(request):
+        return jsonify({"error": f"Missing or invalid {request_profiler.PROFILE_HEADER} header."}), 403
+    return None
+
+@app.route('/api/profiles', methods=['GET'])
+def profiles_api():
+    """
+    API endpoint listing the stored request profiles (newest first) with their download URLs.
+    File names hold the capture time, the endpoint (plus question id for evaluations) and the duration.
+    """
+    error = _profiles_access_error()
+    if error:
+        return error
+    profiles = profiler.list_profiles()
+    for profile in profiles:
+        profile['url'] = url_for('profile_download_api', name=profile['name'])
+    return jsonify({"profiles": profiles, "sample_rate": profiler.sample_rate, "slow_ms": profiler.slow_ms})
+
+@app.route('/api/profiles/<name>', methods=['GET'])
+def profile_download_api(name):
+    """
+    API endpoint downloading one profile as collapsed stacks (input for flamegraph tools).
+    """
+    error = _profiles_access_error()
+    if error:
+        return error
+    if not name.endswith(request_profiler.PROFILE_SUFFIX):
+        return jsonify({"error": "Unknown profile"}), 404
+    return flask.send_from_directory(os.path.abspath(profiler.directory), name, as_attachment=True, mimetype='text/plain')
+
 @app.route('/api/jump_to_question', methods=['POST'])
 def jump_to_question_api():
     if 'username' not in session or 'challenge_id' not in session:
@@ -601,15 +1117,19 @@ def next_question_api():
 
     if current_idx >= len(question_ids): 
         total_time_taken = time.time() - session['start_time']
-        execute_db("INSERT INTO scoreboard (username, challenge_id, score, time_taken_seconds) VALUES (?, ?, ?, ?)",
-                   (session['username'], challenge_id, session['score'], round(total_time_taken)))
+        participant = _contest_participant()
+        if participant is None:
+            record_score(session['username'], challenge_id, session.get('score', 0), round(total_time_taken))
+        elif contest_scheduler.finish(participant): # False if already finalized at the deadline
+            total_time_taken = participant.time_taken(time.time())
+            record_score(session['username'], challenge_id, participant.score, total_time_taken)
         
         # Prepare QNP data for the completion screen as well
         qnp_data = _get_qnp_data(session.get('question_ids', []), session.get('answers', {}))
 
         return jsonify({
             "test_completed": True, 
-            "score": session['score'], 
+            "score": _current_score(participant), 
             "total_time": round(total_time_taken),
             "challenge_id": challenge_id,
             "qnp_data": qnp_data # Send final QNP state
@@ -640,13 +1160,33 @@ def scoreboard_page(challenge_id):
     return render_template('scoreboard.html', scores=scores, challenge=challenge)
 
 
+@app.route('/analytics/<challenge_id>')
+def analytics_page(challenge_id):
+    """
+    Displays score and time statistics for a challenge, served from the precomputed rollups.
+    """
+    if challenge_id not in CHALLENGES:
+        flask.flash("Invalid challenge selected for analytics.", "error")
+        return redirect(url_for('scoreboards_list_page'))
+    analytics = scoreboard_rollups.get_analytics(get_db(), challenge_id)
+    return render_template('analytics.html', analytics=analytics, challenge=CHALLENGES[challenge_id])
+
+@app.route('/api/analytics/<challenge_id>')
+def analytics_api(challenge_id):
+    """
+    API endpoint returning a challenge's analytics (attempts, score distribution, time percentiles) as JSON.
+    """
+    if challenge_id not in CHALLENGES:
+        return jsonify({"error": "Unknown challenge"}), 404
+    return jsonify(scoreboard_rollups.get_analytics(get_db(), challenge_id))
+
 @app.route('/restart_test', methods=['POST'])
 def restart_test():
     """
     Allows the user to restart the test process.
-    Clears the session, redirecting the user to the homepage to select a new challenge/name.
+    Clears the session (keeping contest resume tokens), redirecting the user to the homepage to select a new challenge/name.
     """
-    session.clear() 
+    _reset_session()
     flask.flash("Test restarted. Please select a challenge and enter your name.", "info")
     return redirect(url_for('index'))
 
@@ -659,6 +1199,49 @@ def initdb_command():
     """
     init_db()
 
+@app.cli.command('prewarm')
+def prewarm_command():
+    """
+    Flask CLI command: 'flask prewarm'
+    Builds all lazily created grading caches and reports how long each subsystem took.
+    Useful for measuring cold-start cost; a running server warms itself via POST /api/prewarm
+    or the PREWARM_ON_STARTUP environment variable.
+    """
+    for name, seconds in prewarm().items():
+        print(f"{name}: {seconds * 1000:.1f} ms")
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """
+    Flask CLI command: 'flask rebuild-rollups'
+    Recomputes the per-challenge analytics rollups from the raw scoreboard rows.
+    Use after upgrading an existing database or editing scoreboard rows by hand.
+    """
+    with app.app_context():
+        processed = scoreboard_rollups.rebuild(get_db())
+    print(f"Rebuilt analytics rollups from {processed} scoreboard rows.")
+
+@app.cli.command('score-mcq-sheets')
+@click.argument('challenge_id')
+@click.argument('sheets_file', type=click.File('r'))
+def score_mcq_sheets_command(challenge_id, sheets_file):
+    """
+    Flask CLI command: 'flask score-mcq-sheets <challenge_id> <sheets.jsonl>'
+    Offline bulk scoring of MCQ answer sheets. Each line of the file is a JSON object
+    {"username": ..., "answers": {"<question_id>": <selected_option_index>, ...}}.
+    Prints per-sheet scores and per-question difficulty statistics as JSON.
+    """
+    if challenge_id not in CHALLENGES:
+        raise click.BadParameter(f"Unknown challenge '{challenge_id}'.", param_hint='challenge_id')
+    sheets = [json.loads(line) for line in sheets_file if line.strip()]
+    answer_key = mcq_grading.get_answer_key(challenge_id)
+    report = answer_key.score_sheets([sheet.get('answers', {}) for sheet in sheets])
+    report['sheets'] = [
+        {"username": sheet.get('username'), "score": score, "num_correct": num_correct}
+        for sheet, score, num_correct in zip(sheets, report.pop('scores'), report.pop('num_correct'))
+    ]
+    print(json.dumps(report, indent=2))
+
 # --- Main execution block ---
 if __name__ == '__main__':
     schema_full_path = os.path.join(os.path.dirname(__file__), SCHEMA_FILE)
@@ -679,4 +1262,6 @@ if __name__ == '__main__':
             print(f"Error initializing database directly: {e}", file=sys.stderr)
             sys.exit(1) 
             
+    if os.environ.get('PREWARM_ON_STARTUP'):
+        prewarm() # Otherwise caches are built on first use
     app.run(debug=True, host='0.0.0.0', port=5555)
\ No newline at end of file
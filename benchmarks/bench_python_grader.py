@@ -0,0 +1,71 @@
+# coding_platform_flask/benchmarks/bench_python_grader.py
+
+# Benchmark: Python grading cost as test inputs grow.
+#
+# Compares the current data-driven runner (`evaluate_python`, test cases pickled over stdin)
+# with the previous approach of embedding `repr()` of every input and expected output into a
+# generated source file that the child process then has to compile.
+#
+# Usage (from the project root):
+#     python benchmarks/bench_python_grader.py
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+
+USER_CODE = "def total(values):\n    return sum(values)\n"
+SIZES = [10, 10_000, 200_000, 1_000_000] # Number of list elements per test input
+REPEATS = 3 # Best-of-N timing per size
+
+
+def make_question(size):
+    values = list(range(size))
+    return {"function_name": "total", "test_cases": [
+        {"input_args": [values], "expected_output": sum(values), "name": "Large list"},
+        {"input_args": [values[::-1]], "expected_output": sum(values), "name": "Reversed"},
+    ]}
+
+
+def legacy_evaluate(user_code, question_data):
+    """The previous harness: test data rendered into generated source with repr()."""
+    with tempfile.NamedTemporaryFile(mode="w+", suffix=".py", delete=False) as tmp_code_file:
+        tmp_code_file.write("import json\n\n" + user_code + "\n\n")
+        harness_code = "def run_tests():\n    results = []\n"
+        for test_case in question_data["test_cases"]:
+            input_args_str = ", ".join(map(repr, test_case["input_args"]))
+            harness_code += f"    actual = total({input_args_str})\n"
+            harness_code += f"    results.append(actual == {repr(test_case['expected_output'])})\n"
+        harness_code += "    print(json.dumps(results))\n\nrun_tests()\n"
+        tmp_code_file.write(harness_code)
+        tmp_file_name = tmp_code_file.name
+    try:
+        subprocess.run([sys.executable, tmp_file_name], capture_output=True, text=True, timeout=60)
+    finally:
+        os.remove(tmp_file_name)
+
+
+def best_of(func, *args):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print(f"{'elements':>10}  {'legacy (s)':>11}  {'runner (s)':>11}  {'speedup':>8}")
+    for size in SIZES:
+        question = make_question(size)
+        legacy = best_of(legacy_evaluate, USER_CODE, question)
+        runner = best_of(app.evaluate_python, USER_CODE, question)
+        print(f"{size:>10}  {legacy:>11.3f}  {runner:>11.3f}  {legacy / runner:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# coding_platform_flask/benchmarks/bench_sql_grader.py
+
+# Benchmark: SQL grading throughput for a typical SELECT question.
+#
+# Compares the database work of one grading (set up the question's data, run the user's query
+# and the expected query) in two ways:
+#   - fresh:  sqlite3.connect(':memory:') + executing the schema script per submission (previous approach);
+#   - pooled: sql_grading.evaluation_connection, reusing a preloaded connection inside a
+#             transaction that is rolled back afterwards.
+# Also reports end-to-end evaluate_sql() throughput, which includes HTML rendering.
+#
+# Usage (from the project root):
+#     python benchmarks/bench_sql_grader.py
+
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import sql_grading # noqa: E402
+
+QUESTION_ID = 3 # "Order Customers by Name": a plain SELECT over a small schema
+DURATION_SECONDS = 2.0 # Measuring time per variant
+
+
+def fresh(question, query):
+    db_eval = sqlite3.connect(':memory:')
+    try:
+        db_eval.executescript(question['schema'])
+        db_eval.execute(query).fetchall()
+        db_eval.execute(question['expected_query_output']).fetchall()
+    finally:
+        db_eval.close()
+
+
+def pooled(question, query):
+    with sql_grading.evaluation_connection(question) as db_eval:
+        db_eval.execute(query).fetchall()
+        db_eval.execute(question['expected_query_output']).fetchall()
+
+
+def throughput(func, *args):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < DURATION_SECONDS:
+        func(*args)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    question = app.questions_data.get_question_by_id(QUESTION_ID)
+    query = question['expected_query_output']
+    pooled(question, query) # Build the template and the first pooled connection outside the timing
+
+    fresh_rate = throughput(fresh, question, query)
+    pooled_rate = throughput(pooled, question, query)
+    end_to_end_rate = throughput(app.evaluate_sql, query, question)
+    print(f"fresh connection:     {fresh_rate:10.0f} gradings/s")
+    print(f"pooled connection:    {pooled_rate:10.0f} gradings/s  ({pooled_rate / fresh_rate:.1f}x)")
+    print(f"evaluate_sql (pooled):{end_to_end_rate:10.0f} gradings/s")
+    print(f"pool: {sql_grading.pool_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# coding_platform_flask/benchmarks/bench_startup.py
+
+# Benchmark: application cold start.
+#
+# Each sample starts a fresh interpreter and measures:
+#   - import:          time to `import app` (module-level initialization);
+#   - first_response:  time from import to the first served page (GET /);
+#   - first_sql_eval:  time to grade the first submission of the heaviest SQL question,
+#                      which includes lazily building its fixture template;
+#   - prewarm:         time for app.prewarm() to build every lazy grading cache.
+# Medians are reported. Pass --max-import-ms / --max-first-response-ms to fail (exit code 1)
+# when a regression pushes startup beyond a budget, e.g. in CI.
+#
+# Usage (from the project root):
+#     python benchmarks/bench_startup.py [--runs 5] [--max-import-ms 500] [--max-first-response-ms 200]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside each fresh interpreter; prints one JSON line of measurements in milliseconds
+SAMPLE_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.get('/')
+responded = time.perf_counter()
+sql_question = max((q for q in app.questions_data.QUESTIONS if q['language'] == 'sql'),
+                   key=lambda q: q.get('performance') is not None)
+app.evaluate_sql(sql_question['expected_query_output'], sql_question)
+evaluated = time.perf_counter()
+app.prewarm()
+warmed = time.perf_counter()
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "first_response": (responded - imported) * 1000,
+    "first_sql_eval": (evaluated - responded) * 1000,
+    "prewarm": (warmed - evaluated) * 1000,
+}))
+"""
+
+
+def sample():
+    process = subprocess.run([sys.executable, "-c", SAMPLE_SCRIPT], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, check=True)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-response-ms", type=float)
+    args = parser.parse_args()
+
+    samples = [sample() for _ in range(args.runs)]
+    medians = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+    for key, value in medians.items():
+        print(f"{key:>15}: {value:8.1f} ms (median of {args.runs})")
+
+    failed = False
+    if args.max_import_ms is not None and medians["import"] > args.max_import_ms:
+        print(f"REGRESSION: import {medians['import']:.1f} ms > {args.max_import_ms} ms")
+        failed = True
+    if args.max_first_response_ms is not None and medians["first_response"] > args.max_first_response_ms:
+        print(f"REGRESSION: first response {medians['first_response']:.1f} ms > {args.max_first_response_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+# coding_platform_flask/benchmarks/replay_traffic.py
+
+# Replays a traffic capture (see traffic_capture.py) against a running instance.
+#
+# Record a contest by starting the app with TRAFFIC_CAPTURE_FILE=capture.jsonl, then replay it on a
+# test box at 1x, 10x or 100x speed to see how the deployment copes with the same load:
+#   - every captured participant becomes one replay client with its own session cookie, sending
+#     its requests in the original order at (captured time / speed);
+#   - participants whose capture starts mid-test are logged in first with their recorded challenge;
+#   - submissions are synthesized from the question definitions with the captured size and outcome
+#     (the capture never contains real code): correct SQL/MCQ answers and Python reference solutions
+#     for submissions that passed, the starter code or a wrong option otherwise.
+# The report lists, per endpoint, latency percentiles of the replay next to the captured ones, plus
+# error rates (5xx and connection failures) and shed rates (429/503 from admission control).
+# Note that per-session rate limits (EVALUATE_RATE_PER_SECOND / EVALUATE_BURST) are not scaled with
+# the speed: raise them on the target when replaying faster than 1x to measure grader capacity.
+#
+# Usage (from the project root):
+#     python benchmarks/replay_traffic.py capture.jsonl [--base-url http://127.0.0.1:5555] [--speed 10] [--json]
+
+import argparse
+import collections
+import concurrent.futures
+import http.cookiejar
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import questions_data # noqa: E402  (imported after adjusting sys.path)
+
+REQUEST_TIMEOUT_SECONDS = 60
+PERCENTILES = (50, 90, 99)
+_ROUTE_ARG = re.compile(r"<(?:\w+:)?(\w+)>")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # The login redirect is not part of the captured request; don't follow it
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def load_capture(path):
+    """Reads a capture file and groups its records into per-session request lists, ordered by time."""
+    sessions = collections.defaultdict(list)
+    anonymous = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                (sessions[record['session']] if record.get('session') else anonymous).append(record)
+    flows = [sorted(records, key=lambda r: r['t']) for records in sessions.values()]
+    flows.extend([record] for record in anonymous) # Requests without a test session are independent
+    return flows
+
+
+def _pad(code, length, comment):
+    missing = length - len(code)
+    return code if missing <= len(comment) else code + comment + "x" * (missing - len(comment))
+
+
+def synthesize_submission(shape):
+    """Builds an /api/evaluate body with the captured question, size and outcome."""
+    question = questions_data.get_question_by_id(int(shape.get('question_id') or 0)) or {}
+    passed = shape.get('passed', False)
+    language = question.get('language')
+    if language == 'mcq':
+        correct = question['correct_answer_index']
+        code = str(correct if passed else (correct + 1) % max(1, len(question.get('options', []))))
+    elif language == 'sql':
+        code = question['expected_query_output'] if passed else "SELECT 1;"
+        code = _pad(code, shape.get('code_length', 0), "\n-- ")
+    elif language == 'python':
+        reference = (question.get('performance') or {}).get('reference_solution')
+        code = reference if passed and reference else question.get('starter_code', "")
+        code = _pad(code, shape.get('code_length', 0), "\n# ")
+    else:
+        code = ""
+    return {"question_id": shape.get('question_id'), "code": code}
+
+
+def synthesize_mcq_sheet(challenge_id, count):
+    """Builds an /api/evaluate_mcq_batch body answering `count` of the challenge's MCQs correctly."""
+    mcqs = [q for q in questions_data.QUESTIONS if q.get('challenge_id') == challenge_id and q.get('language') == 'mcq']
+    return {"answers": {str(q['id']): q['correct_answer_index'] for q in mcqs[:count]}}
+
+
+class Replayer:
+    """
+    Sends captured flows to a target instance and collects per-endpoint results.
+    :param base_url: Root URL of the instance under test.
+    :param speed: Time compression factor (10 replays ten minutes of traffic in one).
+    """
+    def __init__(self, base_url, speed):
+        self.base_url = base_url.rstrip('/')
+        self.speed = speed
+        self.results = collections.defaultdict(list) # endpoint -> [(latency_ms, status or None)]
+        self.max_lag = 0.0 # Worst delay behind schedule, to spot an overloaded replayer
+        self._lock = threading.Lock()
+        self._start = None
+
+    def _send(self, opener, record, body=None, form=None, track=True):
+        path = _ROUTE_ARG.sub(lambda m: urllib.parse.quote(str(record['view_args'].get(m.group(1), ''))), record['route'])
+        headers = {}
+        if body is not None:
+            data, headers['Content-Type'] = json.dumps(body).encode('utf-8'), 'application/json'
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode('utf-8')
+        else:
+            data = b"" if record['method'] == 'POST' else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=record['method'])
+        started = time.perf_counter()
+        try:
+            with opener.open(request, timeout=REQUEST_TIMEOUT_SECONDS) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code # Includes the unfollowed login redirect
+        except (urllib.error.URLError, OSError):
+            status = None # Connection failure or timeout
+        latency_ms = (time.perf_counter() - started) * 1000
+        if not track:
+            return
+        with self._lock:
+            self.results[record['endpoint']].append((latency_ms, status))
+
+    def _wait_until(self, captured_t, origin_t):
+        due = self._start + (captured_t - origin_t) / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            with self._lock:
+                self.max_lag = max(self.max_lag, -delay)
+
+    def replay_flow(self, flow, origin_t):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+        logged_in = False
+        for index, record in enumerate(flow):
+            self._wait_until(record['t'], origin_t)
+            if record['endpoint'] == 'index' and record['method'] == 'POST':
+                challenge_id = record['shape'].get('challenge_id') or record.get('challenge_id')
+                self._send(opener, record, form={"username": f"replay-{id(flow)}-{index}", "challenge_id": challenge_id})
+                logged_in = True
+                continue
+            if not logged_in and record.get('challenge_id'):
+                # Capture started mid-test: create the session first (not counted in the results)
+                login = {"endpoint": "index", "method": "POST", "route": "/", "view_args": {}}
+                self._send(opener, login, form={"username": f"replay-{id(flow)}", "challenge_id": record['challenge_id']},
+                           track=False)
+                logged_in = True
+            if record['endpoint'] == 'evaluate_code_api':
+                self._send(opener, record, body=synthesize_submission(record['shape']))
+            elif record['endpoint'] == 'evaluate_mcq_batch_api':
+                self._send(opener, record, body=synthesize_mcq_sheet(record.get('challenge_id'), record['shape'].get('answers', 0)))
+            elif record['endpoint'] == 'jump_to_question_api':
+                self._send(opener, record, body={"index": record['shape'].get('index', 0)})
+            else:
+                self._send(opener, record)
+
+    def run(self, flows, max_workers):
+        origin_t = min(flow[0]['t'] for flow in flows)
+        self._start = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(flows)))) as pool:
+            # Flows are submitted in order of their first request so queued ones start as soon as possible
+            futures = [pool.submit(self.replay_flow, flow, origin_t) for flow in sorted(flows, key=lambda f: f[0]['t'])]
+            for future in futures:
+                future.result() # Surfaces bugs in the replayer itself
+        return time.monotonic() - self._start
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))]
+
+
+def summarize(flows, results):
+    """Combines replay results with the captured latencies into a per-endpoint report."""
+    captured = collections.defaultdict(list)
+    for flow in flows:
+        for record in flow:
+            captured[record['endpoint']].append(record['duration_ms'])
+    report = {}
+    for endpoint in sorted(set(captured) | set(results)):
+        samples = results.get(endpoint, [])
+        latencies = sorted(latency for latency, _ in samples)
+        captured_latencies = sorted(captured.get(endpoint, []))
+        errors = sum(1 for _, status in samples if status is None or status >= 500 and status != 503)
+        shed = sum(1 for _, status in samples if status in (429, 503))
+        report[endpoint] = {
+            "requests": len(samples),
+            "error_rate": round(errors / len(samples), 4) if samples else None,
+            "shed_rate": round(shed / len(samples), 4) if samples else None,
+            "latency_ms": {f"p{p}": _round(percentile(latencies, p)) for p in PERCENTILES},
+            "captured_latency_ms": {f"p{p}": _round(percentile(captured_latencies, p)) for p in PERCENTILES},
+        }
+    return report
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays a traffic capture against a running instance.")
+    parser.add_argument("capture", help="JSONL file written by the traffic recorder")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5555")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor, e.g. 1, 10 or 100")
+    parser.add_argument("--max-workers", type=int, default=256, help="Participants replayed concurrently")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    flows = load_capture(args.capture)
+    if not flows:
+        sys.exit("Capture is empty.")
+    replayer = Replayer(args.base_url, args.speed)
+    elapsed = replayer.run(flows, args.max_workers)
+    report = summarize(flows, replayer.results)
+    total = sum(entry["requests"] for entry in report.values())
+    summary = {"speed": args.speed, "participants": len(flows), "requests": total,
+               "elapsed_seconds": round(elapsed, 2), "requests_per_second": round(total / elapsed, 1) if elapsed else None,
+               "max_schedule_lag_seconds": round(replayer.max_lag, 3), "endpoints": report}
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"Replayed {total} requests from {len(flows)} participants at {args.speed}x in {elapsed:.1f} s "
+          f"({summary['requests_per_second']} req/s, max lag behind schedule {replayer.max_lag:.2f} s)")
+    header = f"{'endpoint':<26}{'requests':>9}{'errors':>8}{'shed':>7}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+    print(header + "   (captured " + "/".join(f"p{p}" for p in PERCENTILES) + ")")
+    for endpoint, entry in report.items():
+        latencies = "".join(f"{_fmt(entry['latency_ms'][f'p{p}']):>9}" for p in PERCENTILES)
+        captured = "/".join(_fmt(entry['captured_latency_ms'][f'p{p}']) for p in PERCENTILES)
+        print(f"{endpoint:<26}{entry['requests']:>9}{_fmt_rate(entry['error_rate']):>8}{_fmt_rate(entry['shed_rate']):>7}"
+              f"{latencies}   ({captured})")
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def _fmt_rate(value):
+    return "-" if value is None else f"{value:.1%}"
+
+
+if __name__ == '__main__':
+    main()
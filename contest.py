@@ -0,0 +1,316 @@
+# coding_platform_flask/contest.py
+
+# Scheduled, timed contests.
+#
+# A contest opens one challenge between a start and an end time. While it runs, the server keeps
+# an authoritative record of every participant (the Flask session lives in a client-side cookie,
+# which a participant could roll back or replace by logging in again to reset their timers).
+# Participants are identified by challenge and username: logging in again during the contest
+# resumes the same attempt (same clocks, deadline and solved questions), and logging in again after
+# finishing is refused, so one username has exactly one attempt and one final score per contest.
+# Resuming requires the attempt's resume token, a random secret handed to the session that joined
+# (the app keeps it in the session cookie across restarts); without it, joining under a username
+# that is already taking part is refused, so nobody can take over someone else's attempt.
+# For each attempt the server keeps:
+#   - score: the sum of the points of the questions solved, kept server-side, so re-solving a
+#     question from a fresh session does not count twice;
+#   - per-question deadlines: a question's clock starts the first time it is shown and runs for
+#     its 'time_limit_seconds'; submissions after that are refused;
+#   - a total deadline per participant: the contest end, or earlier if the contest limits how long
+#     one participant may take ('max_duration_seconds');
+#   - finalization: participants who do not finish the test themselves get their current score
+#     recorded at their deadline. At the contest end every outstanding participant is written in
+#     one bulk transaction.
+# Deadlines are kept in a single min-heap (TimerHeap) served by one thread that sleeps until the
+# earliest deadline, so no session is ever polled.
+#
+# State is held in memory by the worker process: run contests on a single worker process.
+
+import heapq # Deadline min-heap
+import hmac # Constant-time comparison of resume tokens
+import itertools # Tie-breaker for timers with equal deadlines
+import secrets # Resume tokens
+import sys # Reporting failed timer callbacks
+import threading # Timer thread and shared state
+import time # Wall-clock deadlines (contest times are absolute)
+import traceback # Reporting failed timer callbacks
+
+QUESTION_DEADLINE_GRACE_SECONDS = 2 # Tolerance for submissions sent just before a deadline
+
+
+class ContestClosed(Exception):
+    """Raised when an action is refused because a contest or deadline does not allow it."""
+
+
+class TimerHeap:
+    """
+    Runs callbacks at absolute times. Pending timers are kept in a min-heap; one daemon thread
+    sleeps until the earliest deadline (or until an earlier timer is scheduled).
+    Cancelled timers are skipped when they reach the top of the heap.
+    """
+    def __init__(self):
+        self._heap = [] # [deadline, sequence, callback, cancelled] entries
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, deadline, callback):
+        """
+        Schedules `callback()` to run at `deadline` (a time.time() value).
+        :return: A handle for cancel().
+        """
+        entry = [deadline, next(self._sequence), callback, False]
+        with self._condition:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None: # Started on first use
+                self._thread = threading.Thread(target=self._run, name="contest-timers", daemon=True)
+                self._thread.start()
+            self._condition.notify() # The new timer may be the earliest one
+        return entry
+
+    def cancel(self, handle):
+        with self._condition:
+            handle[3] = True
+
+    def __len__(self):
+        with self._condition:
+            return sum(1 for entry in self._heap if not entry[3])
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][3]:
+                    if self._heap:
+                        heapq.heappop(self._heap) # Drop cancelled timers
+                    else:
+                        self._condition.wait()
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue # Re-check: an earlier timer may have been scheduled
+                callback = heapq.heappop(self._heap)[2]
+            try:
+                callback()
+            except Exception:
+                print("Contest timer callback failed:", file=sys.stderr)
+                traceback.print_exc()
+
+
+class Contest:
+    """
+    A scheduled contest for one challenge.
+    :param challenge_id: The challenge taken during the contest.
+    :param start: Start time (time.time() value); participants cannot join before it.
+    :param end: End time; all outstanding participants are finalized then.
+    :param max_duration_seconds: Optional limit on one participant's total time, counted from joining.
+    """
+    def __init__(self, challenge_id, start, end, max_duration_seconds=None):
+        if end <= start:
+            raise ValueError(f"Contest for '{challenge_id}' must end after it starts.")
+        self.challenge_id = challenge_id
+        self.start = start
+        self.end = end
+        self.max_duration_seconds = max_duration_seconds
+        self.finalized = False
+
+    def status(self, now):
+        if self.finalized or now >= self.end:
+            return "ended"
+        return "running" if now >= self.start else "scheduled"
+
+
+def participant_key(challenge_id, username):
+    """Identity of a contest attempt: usernames are compared case-insensitively."""
+    return challenge_id, username.strip().casefold()
+
+
+class Participant:
+    """Server-side record of one participant's contest attempt."""
+    def __init__(self, contest, username, joined_at):
+        self.contest = contest
+        self.username = username
+        self.joined_at = joined_at
+        deadline = contest.end
+        if contest.max_duration_seconds:
+            deadline = min(deadline, joined_at + contest.max_duration_seconds)
+        self.deadline = deadline
+        self.solved = {} # question id -> points earned
+        self.question_opened = {} # question id -> time it was first shown
+        self.resume_token = secrets.token_hex(16) # Proves a later session belongs to the same person
+        self.done = False # Finished by the participant or finalized at the deadline
+        self.timer = None
+
+    @property
+    def score(self):
+        return sum(self.solved.values())
+
+    def time_taken(self, now):
+        return round(min(now, self.deadline) - self.joined_at)
+
+
+class ContestScheduler:
+    """
+    Tracks contests and their participants and enforces deadlines.
+    :param record_scores: Callback receiving a list of (username, challenge_id, score, time_taken_seconds)
+                          tuples; it must write them all in one transaction.
+    :param question_time_limit: Callback returning a question id's time limit in seconds (or None).
+    """
+    def __init__(self, record_scores, question_time_limit):
+        self.record_scores = record_scores
+        self.question_time_limit = question_time_limit
+        self.timers = TimerHeap()
+        self._contests = {} # challenge id -> Contest
+        self._participants = {} # participant_key(challenge id, username) -> Participant
+        self._sessions = {} # session key -> Participant (several sessions may resume one attempt)
+        self._lock = threading.Lock()
+        self._stats = {"joined": 0, "resumed": 0, "resume_refused": 0, "finished": 0, "finalized_at_deadline": 0, "finalized_at_end": 0}
+
+    def add_contest(self, contest):
+        """Registers a contest and schedules its end-of-contest finalizer."""
+        with self._lock:
+            self._contests[contest.challenge_id] = contest
+        self.timers.schedule(contest.end, lambda: self.finalize_contest(contest.challenge_id))
+
+    def contest_for(self, challenge_id):
+        """Returns the Contest scheduled for a challenge, or None if the challenge is freely available."""
+        return self._contests.get(challenge_id)
+
+    def join(self, challenge_id, session_key, username, now=None, resume_token=None):
+        """
+        Registers a participant of a running contest, or resumes their attempt if the username
+        already joined and `resume_token` matches (the new session is bound to the existing Participant).
+        :param resume_token: The Participant.resume_token given to the session that joined, if any.
+        :return: A tuple (participant, resumed).
+        :raises ContestClosed: If the contest has not started yet or has ended, if this username
+                               already finished the contest, or if it is taking part and the
+                               resume token does not match.
+        """
+        now = time.time() if now is None else now
+        contest = self._contests[challenge_id]
+        status = contest.status(now)
+        if status == "scheduled":
+            raise ContestClosed(f"This contest starts at {time.strftime('%Y-%m-%d %H:%M', time.localtime(contest.start))}.")
+        if status == "ended":
+            raise ContestClosed("This contest has ended.")
+        key = participant_key(challenge_id, username)
+        with self._lock:
+            participant = self._participants.get(key)
+            if participant is not None:
+                if participant.done:
+                    raise ContestClosed("You have already completed this contest.")
+                if not resume_token or not hmac.compare_digest(resume_token, participant.resume_token):
+                    self._stats["resume_refused"] += 1
+                    raise ContestClosed("This name is already taking part in this contest. "
+                                        "Continue in the browser you started in, or choose another name.")
+                self._sessions[session_key] = participant
+                self._stats["resumed"] += 1
+                return participant, True
+            participant = self._participants[key] = Participant(contest, username, now)
+            self._sessions[session_key] = participant
+            self._stats["joined"] += 1
+        if participant.deadline < contest.end: # Otherwise the end-of-contest finalizer covers it
+            participant.timer = self.timers.schedule(participant.deadline, lambda: self._finalize_participant(participant))
+        return participant, False
+
+    def participant(self, session_key):
+        """Returns the Participant for a session, or None if the session is not in a contest."""
+        return self._sessions.get(session_key)
+
+    def open_question(self, participant, question_id, now=None):
+        """
+        Starts a question's clock the first time it is shown (later views keep the original start).
+        :return: Seconds already spent on the question.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            opened = participant.question_opened.setdefault(question_id, now)
+        return now - opened
+
+    def check_active(self, participant, now=None):
+        """
+        Verifies the participant may still submit answers.
+        :raises ContestClosed: If the participant's total deadline has passed.
+        """
+        now = time.time() if now is None else now
+        if participant.done or now > participant.deadline + QUESTION_DEADLINE_GRACE_SECONDS:
+            raise ContestClosed("Your contest time is over.")
+
+    def check_submission(self, participant, question_id, now=None):
+        """
+        Verifies a submission for a question is still allowed.
+        :raises ContestClosed: If the participant's total deadline or the question's time limit has passed.
+        """
+        now = time.time() if now is None else now
+        self.check_active(participant, now)
+        limit = self.question_time_limit(question_id)
+        opened = self.open_question(participant, question_id, now) # Answering unseen questions starts their clock
+        if limit is not None and opened > limit + QUESTION_DEADLINE_GRACE_SECONDS:
+            raise ContestClosed("The time limit for this question has expired.")
+
+    def record_correct(self, participant, question_id, points):
+        """Credits a solved question once; later correct answers to it earn nothing."""
+        with self._lock:
+            if not participant.done:
+                participant.solved.setdefault(question_id, points)
+
+    def finish(self, participant):
+        """
+        Marks a participant as finished by completing the test themselves.
+        :return: True if the caller should record the score, False if it was already finalized.
+        """
+        with self._lock:
+            if participant.done:
+                return False
+            participant.done = True
+            self._stats["finished"] += 1
+        if participant.timer is not None:
+            self.timers.cancel(participant.timer)
+        return True
+
+    def _finalize_participant(self, participant):
+        with self._lock:
+            if participant.done:
+                return
+            participant.done = True
+            self._stats["finalized_at_deadline"] += 1
+        self.record_scores([(participant.username, participant.contest.challenge_id,
+                             participant.score, participant.time_taken(participant.deadline))])
+
+    def finalize_contest(self, challenge_id):
+        """
+        Ends a contest: records the score of every participant who has not finished yet,
+        all in one transaction (through `record_scores`).
+        :return: Number of participants finalized.
+        """
+        with self._lock:
+            contest = self._contests[challenge_id]
+            if contest.finalized:
+                return 0
+            contest.finalized = True
+            outstanding = [p for p in self._participants.values() if p.contest is contest and not p.done]
+            for participant in outstanding:
+                participant.done = True
+            self._stats["finalized_at_end"] += len(outstanding)
+        for participant in outstanding:
+            if participant.timer is not None:
+                self.timers.cancel(participant.timer)
+        if outstanding:
+            self.record_scores([(p.username, challenge_id, p.score, p.time_taken(contest.end)) for p in outstanding])
+        return len(outstanding)
+
+    def stats(self, now=None):
+        """Returns each contest's status and participant counts, plus scheduler counters."""
+        now = time.time() if now is None else now
+        with self._lock:
+            contests = {}
+            for challenge_id, contest in self._contests.items():
+                participants = [p for p in self._participants.values() if p.contest is contest]
+                contests[challenge_id] = {
+                    "status": contest.status(now),
+                    "start": contest.start,
+                    "end": contest.end,
+                    "max_duration_seconds": contest.max_duration_seconds,
+                    "participants": len(participants),
+                    "active": sum(1 for p in participants if not p.done),
+                }
+            return {"contests": contests, **self._stats, "pending_timers": len(self.timers)}
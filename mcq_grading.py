@@ -0,0 +1,169 @@
+# coding_platform_flask/mcq_grading.py
+
+# Bulk grading of Multiple Choice Questions (MCQs).
+#
+# Instead of grading MCQ answers one request at a time, the questions of a challenge are
+# compiled once into an answer key made of parallel arrays (question ids, correct option
+# indices, points). A whole answer sheet, or thousands of them, can then be graded with a
+# single element-wise comparison against that key.
+#
+# NumPy is used when it is installed (recommended for offline scoring of large batches);
+# otherwise the same computations fall back to plain Python lists. It is only imported the
+# first time bulk scoring runs, so it does not slow down application startup.
+
+import functools # For caching compiled answer keys per challenge
+import questions_data # Question definitions
+
+UNANSWERED = -1 # Encoded value for a question that was skipped
+INVALID = -2 # Encoded value for an answer that is not one of the question's options (graded as incorrect)
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """Returns the numpy module (imported on first call), or None if it is not installed."""
+    try:
+        import numpy # Optional: vectorized bulk scoring
+    except ImportError:
+        return None
+    return numpy
+
+
+class AnswerKey:
+    """
+    Precomputed answer key for all MCQs of one challenge.
+    Position `i` of every array refers to the same question.
+    :param questions: List of MCQ question dictionaries (see questions_data.py).
+    """
+    def __init__(self, questions):
+        self.question_ids = [q['id'] for q in questions]
+        self.position = {qid: i for i, qid in enumerate(self.question_ids)} # question id -> array position
+        self.correct = [q['correct_answer_index'] for q in questions]
+        self.points = [q['points'] for q in questions]
+        self.num_options = [len(q.get('options', [])) for q in questions]
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def encode_sheet(self, answers):
+        """
+        Converts an answer sheet into a list of selected option indices aligned with the key.
+        :param answers: Dictionary mapping question id (int or str) to the selected option index.
+                        Answers to unknown questions are ignored; None counts as skipped.
+        :return: List of selected indices, with UNANSWERED for skipped questions and INVALID for answers
+                 that are not a valid option index (graded as incorrect, like single-answer grading does).
+        """
+        encoded = [UNANSWERED] * len(self.question_ids)
+        for q_id, selected in answers.items():
+            try:
+                pos = self.position.get(int(q_id))
+            except (TypeError, ValueError):
+                continue
+            if pos is None or selected is None:
+                continue
+            try:
+                selected = int(selected)
+            except (TypeError, ValueError):
+                selected = INVALID
+            encoded[pos] = selected if 0 <= selected < self.num_options[pos] else INVALID
+        return encoded
+
+    def grade_sheet(self, answers):
+        """
+        Grades a single answer sheet in one pass over the key.
+        :param answers: Dictionary mapping question id to the selected option index.
+        :return: List of (question_id, selected_index, is_correct) tuples for answered questions only
+                 (selected_index is INVALID for answers that are not one of the options).
+        """
+        encoded = self.encode_sheet(answers)
+        return [
+            (q_id, selected, selected == correct)
+            for q_id, selected, correct in zip(self.question_ids, encoded, self.correct)
+            if selected != UNANSWERED
+        ]
+
+    def score_sheets(self, sheets):
+        """
+        Scores many answer sheets at once and computes per-question difficulty statistics.
+        :param sheets: List of answer dictionaries (question id -> selected option index).
+        :return: Dictionary with per-sheet 'scores' and 'num_correct', and 'questions' statistics:
+                 - attempted / correct: Number of sheets that answered / answered correctly.
+                 - p_value: Share of attempting sheets that answered correctly (higher is easier).
+                 - discrimination: Correct rate of the top 27% of sheets minus the bottom 27%,
+                   ranked by total score (classical item analysis; near 0 or negative flags a poor item).
+                 - option_counts: How many sheets picked each option.
+        """
+        matrix = [self.encode_sheet(answers) for answers in sheets]
+        np = _numpy()
+        if np is not None:
+            return self._score_matrix_numpy(np, matrix)
+        return self._score_matrix_python(matrix)
+
+    def _score_matrix_numpy(self, np, matrix):
+        selected = np.array(matrix, dtype=np.int64).reshape(len(matrix), len(self.question_ids))
+        answered = selected != UNANSWERED
+        correct = selected == np.array(self.correct, dtype=np.int64) # Broadcasts the key across every sheet
+        scores = correct @ np.array(self.points, dtype=np.int64)
+        num_correct = correct.sum(axis=1)
+
+        group = max(1, int(round(len(matrix) * 0.27)))
+        order = np.argsort(scores, kind='stable')
+        lower, upper = order[:group], order[-group:]
+        upper_rate = correct[upper].mean(axis=0) if len(matrix) else np.zeros(len(self))
+        lower_rate = correct[lower].mean(axis=0) if len(matrix) else np.zeros(len(self))
+
+        attempted = answered.sum(axis=0)
+        correct_counts = correct.sum(axis=0)
+        questions = []
+        for i, q_id in enumerate(self.question_ids):
+            column = selected[:, i]
+            option_counts = np.bincount(column[column >= 0], minlength=self.num_options[i])
+            questions.append(self._question_stats(
+                q_id, int(attempted[i]), int(correct_counts[i]),
+                float(upper_rate[i] - lower_rate[i]), option_counts.tolist()))
+        return {"scores": scores.tolist(), "num_correct": num_correct.tolist(), "questions": questions}
+
+    def _score_matrix_python(self, matrix):
+        correct = [[sel == key for sel, key in zip(row, self.correct)] for row in matrix]
+        scores = [sum(p for ok, p in zip(row, self.points) if ok) for row in correct]
+        num_correct = [sum(row) for row in correct]
+
+        group = max(1, int(round(len(matrix) * 0.27)))
+        order = sorted(range(len(matrix)), key=scores.__getitem__)
+        lower, upper = order[:group], order[-group:]
+
+        questions = []
+        for i, q_id in enumerate(self.question_ids):
+            column = [row[i] for row in matrix]
+            option_counts = [0] * self.num_options[i]
+            for sel in column:
+                if sel >= 0:
+                    option_counts[sel] += 1
+            upper_rate = sum(correct[s][i] for s in upper) / len(upper) if matrix else 0.0
+            lower_rate = sum(correct[s][i] for s in lower) / len(lower) if matrix else 0.0
+            questions.append(self._question_stats(
+                q_id, sum(sel != UNANSWERED for sel in column), sum(row[i] for row in correct),
+                upper_rate - lower_rate, option_counts))
+        return {"scores": scores, "num_correct": num_correct, "questions": questions}
+
+    def _question_stats(self, q_id, attempted, correct, discrimination, option_counts):
+        return {
+            "question_id": q_id,
+            "attempted": attempted,
+            "correct": correct,
+            "p_value": round(correct / attempted, 4) if attempted else None,
+            "discrimination": round(discrimination, 4),
+            "option_counts": option_counts,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_answer_key(challenge_id):
+    """
+    Returns the (cached) answer key for all MCQs of a challenge.
+    Question definitions are static for the lifetime of the process, so the key is built once.
+    :param challenge_id: The ID of the challenge.
+    :return: An AnswerKey instance (possibly empty if the challenge has no MCQs).
+    """
+    mcqs = [q for q in questions_data.QUESTIONS
+            if q.get('challenge_id') == challenge_id and q.get('language') == 'mcq']
+    return AnswerKey(mcqs)
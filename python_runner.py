@@ -0,0 +1,206 @@
+# coding_platform_flask/python_runner.py
+
+# Child-process test runner for Python submissions.
+#
+# `evaluate_python` in app.py starts this script in a subprocess and writes a pickled payload
+# to its stdin:
+#   {"bytecode": <marshaled code object of the user's source>, "func_name": <function to call>,
+#    "test_cases": [(input_args, expected_output), ...],
+#    "performance": None or {"stress_inputs": [<pickled input_args>, ...],
+#                            "expected_outputs": [<pickled reference output>, ...],
+#                            "budgets": [<seconds allowed per stress input>, ...], "repeats": int}}
+# Test data is never embedded into generated source code, so harness overhead does not grow
+# with the size of the inputs, and any picklable value (tuples, sets, large lists, strings
+# with arbitrary characters) reaches the user's function exactly as defined.
+#
+# The parent also passes the number of a file descriptor (first command-line argument) that the
+# results are written to, as one JSON object, once all of the user's code has run:
+#   {"tests": [{"passed": bool, "actual": <repr or None>, "error": <str or None>, "seconds": float}, ...],
+#    "performance": [{"seconds": float or None, "error": <str or None>}, ...]}
+# Results never travel over stdout: before any user code runs, file descriptor 1 is pointed at
+# /dev/null (and Python-level prints are captured and discarded), so a submission writing its own
+# "results" to stdout and exiting early produces no results at all. The results descriptor is made
+# non-inheritable so processes started by the user's code do not get it. (The user's code still runs
+# in this process, so this is no sandbox: the parent also rejects results that do not cover every test.)
+#
+# Time budgets are never measured next to the user's code, which could slow the reference down
+# (e.g. by replacing builtins) to inflate its own budget. For performance-graded questions the parent
+# first starts this script in reference mode, a separate process that only loads the reference
+# solution:
+#   {"mode": "reference", "bytecode": <reference solution>, "func_name": ..., "stress_inputs": [...],
+#    "repeats": int}
+# which reports {"reference_seconds": [[seconds, ...], ...]}, one list per stress input; the parent
+# turns those into the budgets of the user's run and compares the user's times with them.
+#
+# User code runs in the same process as the user's timings, so the clock is bound when this module
+# is imported, before any user code executes: patching `time.perf_counter` from a submission does not
+# affect measurements. Where interval timers are available (POSIX), a stress run exceeding
+# ABORT_BUDGET_FACTOR times its budget is interrupted with SIGALRM instead of running to completion.
+# If the user's code fails to even load, the traceback goes to stderr and the exit code is 1.
+
+import contextlib # For capturing prints from the user's code
+import io # In-memory buffer for captured prints
+import json # Result serialization back to the parent process
+import marshal # Loading the user's code, compiled (and cached) by the parent process
+import os # File descriptors of the results channel
+import pickle # Test case transport from the parent process
+import signal # Interrupting stress runs that are far over budget
+import sys # Standard streams and exit codes
+import traceback # Reporting errors raised while loading the user's code
+from time import perf_counter as _clock # Bound before user code runs (see above)
+
+MAX_REPR_LENGTH = 1000 # Longest return-value repr sent back to the parent (for display only)
+ABORT_BUDGET_FACTOR = 4 # A stress run is interrupted once it reaches this multiple of the budget
+_CAN_ABORT = hasattr(signal, 'setitimer')
+
+
+class _OverBudget(BaseException):
+    """Raised inside the user's function by SIGALRM when a stress run reaches its time limit."""
+
+
+def _on_alarm(signum, frame):
+    raise _OverBudget()
+
+
+def _short_repr(value):
+    text = repr(value)
+    if len(text) > MAX_REPR_LENGTH:
+        text = text[:MAX_REPR_LENGTH] + "..."
+    return text
+
+
+def run_tests(func, test_cases):
+    """
+    Calls `func` with each test case's arguments and compares the result with the expected output.
+    :param func: The user's function.
+    :param test_cases: List of (input_args, expected_output) tuples.
+    :return: List of JSON-serializable result dictionaries.
+    """
+    results = []
+    for input_args, expected in test_cases:
+        start = _clock()
+        try:
+            actual = func(*input_args)
+            seconds = _clock() - start
+            results.append({"passed": bool(actual == expected), "actual": _short_repr(actual), "error": None, "seconds": seconds})
+        except Exception as e_test: # Errors raised by the user's function for this test case
+            results.append({"passed": False, "actual": None, "error": str(e_test), "seconds": _clock() - start})
+    return results
+
+
+def _timed_call(func, pickled_args, limit=None):
+    # Every call gets a fresh copy of the input (unpickled outside the timed region),
+    # so a function that mutates its arguments cannot affect the next measurement.
+    # Returns (seconds, result, aborted); with a `limit`, the call is interrupted once it takes that long.
+    input_args = pickle.loads(pickled_args)
+    limit = limit if _CAN_ABORT else None
+    start = _clock()
+    try:
+        if limit is not None:
+            signal.setitimer(signal.ITIMER_REAL, limit)
+        try:
+            result = func(*input_args)
+        finally:
+            if limit is not None:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except _OverBudget:
+        return _clock() - start, None, True
+    return _clock() - start, result, False
+
+
+def run_performance_tests(func, settings):
+    """
+    Times the user's function on each stress input and checks its result against the reference
+    solution's output. The best of `repeats` runs is kept. Runs reaching ABORT_BUDGET_FACTOR times
+    the input's budget are interrupted and count with the time they reached; the parent compares
+    the best time with the budget.
+    :param func: The user's function.
+    :param settings: The "performance" part of the payload.
+    :return: List of JSON-serializable result dictionaries, one per stress input.
+    """
+    if _CAN_ABORT:
+        signal.signal(signal.SIGALRM, _on_alarm)
+    results = []
+    for pickled_args, pickled_expected, budget in zip(settings["stress_inputs"], settings["expected_outputs"], settings["budgets"]):
+        expected = pickle.loads(pickled_expected)
+        user_times = []
+        try:
+            for _ in range(settings["repeats"]):
+                seconds, actual, aborted = _timed_call(func, pickled_args, ABORT_BUDGET_FACTOR * budget)
+                user_times.append(seconds)
+                if aborted or seconds > 2 * budget:
+                    break # Clearly over budget: further repeats cannot change the verdict
+                if not actual == expected:
+                    raise ValueError("Result differs from the reference solution on this stress input.")
+        except Exception as e_test:
+            results.append({"seconds": min(user_times, default=None), "error": str(e_test)})
+            continue
+        results.append({"seconds": min(user_times), "error": None})
+    return results
+
+
+def run_reference_timings(reference, settings):
+    """
+    Times the reference solution `repeats` times on each stress input (reference mode).
+    :return: List of lists of seconds, one list per stress input.
+    """
+    return [[_timed_call(reference, pickled_args)[0] for _ in range(settings["repeats"])]
+            for pickled_args in settings["stress_inputs"]]
+
+
+def _load_function(bytecode, func_name):
+    namespace = {"__name__": "__submission__"}
+    exec(marshal.loads(bytecode), namespace)
+    return namespace.get(func_name)
+
+
+def _detach_stdout():
+    # Point file descriptor 1 at /dev/null so nothing written to stdout reaches the parent
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+
+def _write_results(results_fd, results):
+    with os.fdopen(results_fd, 'w', encoding='utf-8') as results_file:
+        results_file.write(json.dumps(results))
+
+
+def main():
+    results_fd = int(sys.argv[1])
+    os.set_inheritable(results_fd, False)
+    _detach_stdout()
+    payload = pickle.load(sys.stdin.buffer)
+
+    if payload.get("mode") == "reference": # Trusted code only: no submission is loaded in this process
+        reference = _load_function(payload["bytecode"], payload["func_name"])
+        _write_results(results_fd, {"reference_seconds": run_reference_timings(reference, payload)})
+        return 0
+
+    performance = payload.get("performance")
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured):
+        try:
+            func = _load_function(payload["bytecode"], payload["func_name"])
+        except BaseException:
+            exc_type, exc_value, exc_tb = sys.exc_info()
+            traceback.print_exception(exc_type, exc_value, exc_tb.tb_next.tb_next) # Hide this runner's own frames
+            return 1
+
+        if not callable(func):
+            error = f"Function '{payload['func_name']}' is not defined."
+            results = [{"passed": False, "actual": None, "error": error, "seconds": 0.0} for _ in payload["test_cases"]]
+        else:
+            results = run_tests(func, payload["test_cases"])
+
+        performance_results = []
+        # Efficiency is only measured once the function is correct on the regular test cases
+        if performance and results and all(r["passed"] for r in results):
+            performance_results = run_performance_tests(func, performance)
+
+    _write_results(results_fd, {"tests": results, "performance": performance_results})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
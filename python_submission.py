@@ -0,0 +1,213 @@
+# coding_platform_flask/python_submission.py
+
+# Parent-side preparation of Python submissions before they are sent to python_runner.py.
+#
+# The user's source is parsed once with `ast` to:
+#   - find the top-level functions it defines, so the question's declared entry point
+#     ("function_name" in questions_data.py) can be checked before starting a subprocess;
+#   - spot loops that certainly never end (e.g. `while True:` with no break, return, raise or call
+#     and no enclosing try), which are reported to the user as a warning next to the results;
+#     the runner's timeout still ends them, so terminating code is never rejected.
+# The source is then compiled to bytecode, which is marshaled and sent to the runner so the
+# child process does not have to compile it again. Results are cached by source hash, so
+# re-running the same code (a common pattern when users click "Run" repeatedly) is free.
+#
+# For performance-graded questions, the reference solution, stress inputs and the reference's
+# outputs are also prepared here, once per question, along with the time budget computation:
+# budgets are always derived in the parent from reference timings taken in a process that never
+# runs user code (see python_runner.py).
+
+import ast # Parsing and structural validation of submissions
+import collections # OrderedDict for the LRU cache
+import hashlib # Source hashing for cache keys
+import marshal # Bytecode serialization for the runner process
+import pickle # Serialization of stress-test inputs for the runner process
+import threading # Guards the cache across request threads
+
+CACHE_SIZE = 512 # Number of distinct submissions kept compiled in memory
+
+# Defaults for the optional "performance" block of Python questions (see questions_data.py)
+DEFAULT_MAX_TIME_RATIO = 3.0 # User's best time may be at most this multiple of the reference's
+DEFAULT_PERFORMANCE_REPEATS = 3 # Timed runs per stress input; the best run counts
+DEFAULT_MIN_REFERENCE_SECONDS = 0.001 # Reference times below this are treated as this (timer resolution)
+
+
+class Submission:
+    """
+    The result of preparing one submission's source.
+    :param bytecode: Marshaled code object, or None if the source does not compile.
+    :param functions: Dictionary of top-level function name -> ast.FunctionDef node.
+    :param error: Human-readable reason the source was rejected, or None.
+    :param warnings: Human-readable notes shown with the results (e.g. a loop that never ends).
+    """
+    def __init__(self, bytecode, functions, error, warnings=()):
+        self.bytecode = bytecode
+        self.functions = functions
+        self.error = error
+        self.warnings = list(warnings)
+
+    def check_entry_point(self, func_name):
+        """
+        Verifies the submission defines the function the question calls.
+        :return: An error message, or None if the entry point exists.
+        """
+        if self.error:
+            return self.error
+        if func_name not in self.functions:
+            return f"Function '{func_name}' is not defined at the top level of your code."
+        return None
+
+
+_cache = collections.OrderedDict() # source hash -> Submission
+_cache_lock = threading.Lock()
+
+
+_TRY_NODES = tuple(t for t in (ast.Try, getattr(ast, 'TryStar', None)) if t is not None)
+_LOOP_EXITS = (ast.Break, ast.Return, ast.Raise, ast.Yield, ast.YieldFrom, ast.Await, ast.Assert)
+
+
+def _may_leave(nodes):
+    """
+    Returns True if any statement in `nodes` may leave the enclosing loop: break, return, raise,
+    yield, await, assert, or any call (a called function may raise, e.g. next() or sys.exit()).
+    """
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, _LOOP_EXITS + (ast.Call,)):
+                return True
+    return False
+
+
+def find_infinite_loops(tree):
+    """
+    Looks for `while <always true>:` loops that certainly never end: no break, return, raise, assert
+    or call in their body, and no enclosing `try` that could be waiting for an exception from them.
+    Loops that may end through an exception are left alone; real infinite loops still end at the
+    grading timeout, so this only feeds a warning.
+    :param tree: Parsed module AST.
+    :return: Line numbers of such loops, in source order.
+    """
+    lines = []
+
+    def visit(node, in_try):
+        if isinstance(node, ast.While) and isinstance(node.test, ast.Constant) and node.test.value:
+            if not in_try and not _may_leave(node.body):
+                lines.append(node.lineno)
+        for child in ast.iter_child_nodes(node):
+            visit(child, in_try or isinstance(node, _TRY_NODES))
+
+    visit(tree, False)
+    return lines
+
+
+def _prepare(user_code):
+    try:
+        tree = ast.parse(user_code, filename="<submission>")
+    except SyntaxError as e:
+        return Submission(None, {}, f"SyntaxError on line {e.lineno}: {e.msg}")
+
+    functions = {node.name: node for node in tree.body
+                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    warnings = [f"Line {line}: this loop never ends (no break, return, raise, assert or function call), "
+                "so your code may run until the time limit." for line in find_infinite_loops(tree)]
+
+    try:
+        code = compile(tree, "<submission>", "exec")
+    except (SyntaxError, ValueError) as e: # Errors only detected at compile time (e.g. 'return' outside function)
+        return Submission(None, functions, f"{type(e).__name__}: {e}")
+    return Submission(marshal.dumps(code), functions, None, warnings)
+
+
+def prepare(user_code):
+    """
+    Parses, validates and compiles a submission, using the cache when the same source was seen before.
+    :param user_code: The Python source submitted by the user.
+    :return: A Submission instance.
+    """
+    key = hashlib.sha256(user_code.encode('utf-8')).hexdigest()
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    submission = _prepare(user_code) # Compiled outside the lock; a rare duplicate compile is harmless
+
+    with _cache_lock:
+        _cache[key] = submission
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False) # Evict the least recently used entry
+    return submission
+
+
+def entry_point_for(question_data):
+    """
+    Returns the name of the function a Python question calls.
+    Uses the question's "function_name" field; older question definitions without it fall back
+    to the first top-level function of the question's starter code (never the user's code).
+    :raises ValueError: If neither gives a function name (an error in the question definition).
+    """
+    if question_data.get('function_name'):
+        return question_data['function_name']
+    try:
+        starter = ast.parse(question_data.get('starter_code', ''))
+    except SyntaxError as e:
+        raise ValueError(f"Question {question_data['id']} has no 'function_name' and its starter code "
+                         f"does not parse (line {e.lineno}: {e.msg}).")
+    for node in starter.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return node.name
+    raise ValueError(f"Question {question_data['id']} has no 'function_name' and its starter code defines no function.")
+
+
+_performance_payloads = {} # question id -> runner payload for the performance block
+_performance_lock = threading.Lock()
+
+
+def performance_payload(question_data):
+    """
+    Builds (once per question) the data needed to performance-grade a question: the compiled
+    reference solution, the pickled stress inputs and the reference's output for each of them
+    (computed here, in the parent process, from the trusted reference solution). Generating large
+    stress inputs can be slow, so it only happens the first time the question is graded.
+    :param question_data: A Python question dictionary.
+    :return: The payload dictionary, or None if the question is not performance-graded.
+    :raises ValueError: If the reference solution is invalid (an error in the question definition).
+    """
+    settings = question_data.get('performance')
+    if not settings:
+        return None
+    with _performance_lock:
+        payload = _performance_payloads.get(question_data['id'])
+        if payload is None:
+            reference = prepare(settings['reference_solution'])
+            func_name = entry_point_for(question_data)
+            if reference.error or func_name not in reference.functions:
+                raise ValueError(f"Reference solution of question {question_data['id']} is invalid: "
+                                 f"{reference.error or reference.check_entry_point(func_name)}")
+            namespace = {"__name__": "__reference__"}
+            exec(marshal.loads(reference.bytecode), namespace)
+            # Each input is pickled separately so the runner can hand out a fresh copy per call
+            stress_inputs = [pickle.dumps(args, protocol=pickle.HIGHEST_PROTOCOL) for args in settings['stress_inputs']()]
+            payload = _performance_payloads[question_data['id']] = {
+                "reference_bytecode": reference.bytecode,
+                "stress_inputs": stress_inputs,
+                "expected_outputs": [pickle.dumps(namespace[func_name](*pickle.loads(args)), protocol=pickle.HIGHEST_PROTOCOL)
+                                     for args in stress_inputs],
+                "repeats": settings.get('repeats', DEFAULT_PERFORMANCE_REPEATS),
+                "max_time_ratio": settings.get('max_time_ratio', DEFAULT_MAX_TIME_RATIO),
+                "min_reference_seconds": settings.get('min_reference_seconds', DEFAULT_MIN_REFERENCE_SECONDS),
+            }
+    return payload
+
+
+def time_budget(reference_times, payload):
+    """
+    Returns the time allowed for one stress input: a multiple of the reference's best run (floored
+    at the timer resolution), plus the spread of the reference's own timings as noise allowance.
+    :param reference_times: The reference solution's timings on that input, in seconds.
+    :param payload: The question's performance payload (see performance_payload).
+    """
+    reference_best = max(min(reference_times), payload["min_reference_seconds"])
+    noise = max(reference_times) - min(reference_times)
+    return reference_best * payload["max_time_ratio"] + noise
@@ -13,7 +13,8 @@
 #   - "description": (String) A detailed description of the problem or task.
 #   - "points": (Integer) Points awarded for correctly solving the question.
 #   - "time_limit_seconds": (Integer) Suggested time limit for the question in seconds.
-#                           (Currently informational, not strictly enforced by backend to stop submission).
+#                           Informational in free practice; enforced by the server during scheduled contests
+#                           (see CONTESTS in app.py), counted from when the question is first shown.
 #   - "remarks": (String, Optional) Additional notes or hints about the question (e.g., interview source).
 #
 # Fields specific to SQL questions ("language": "sql"):
@@ -23,19 +24,73 @@
 #   - "expected_query_output": (String) A SQL query that produces the correct result set.
 #                              The user's query output is compared against the output of this query.
 #   - "starter_query": (String, Optional) A pre-filled SQL query for the user to start with or fix.
+#   - "read_only": (Boolean, Optional) Defaults to True: submissions run with `PRAGMA query_only` and may not
+#                  modify data. Set to False for questions expecting INSERT/UPDATE/DELETE. Changes are always
+#                  rolled back after grading either way.
+#
+#   - "performance": (Dictionary, Optional) Makes the question performance-graded. The user's query must then
+#                    also stay within a budget of SQLite VM steps and avoid full scans of the listed tables:
+#       - "fixture": (Callable, Optional) Receives a sqlite3 cursor after "schema" ran and inserts generated
+#                    (typically large) data. Runs once per worker; submissions get a copy of the result.
+#       - "max_vm_steps": (Integer, Optional) Absolute VM step budget for the user's query.
+#       - "max_steps_ratio": (Float, Optional) Budget as a multiple of the expected query's VM steps (default 3.0),
+#                            used when "max_vm_steps" is not set.
+#       - "reference_setup": (String, Optional) SQL run before measuring the expected query (e.g. CREATE INDEX).
+#       - "forbid_full_scan": (List of Strings, Optional) Tables that EXPLAIN QUERY PLAN must not show as SCAN
+#                             (matched case-insensitively, also when the query gives the table an alias).
+#       - "allow_index_creation": (Boolean, Optional) Lets the user's submission start with CREATE INDEX statements.
 #
 # Fields specific to Python questions ("language": "python"):
 #   - "starter_code": (String) Boilerplate code provided to the user to start with.
 #                     Typically includes the function signature.
+#   - "function_name": (String) Name of the top-level function the grader calls with each test case.
+#                      If omitted, the first function defined in "starter_code" is used.
 #   - "test_cases": (List of Dictionaries) Each dictionary defines a test case:
 #       - "input_args": (List) A list of arguments that will be passed to the user's function.
 #       - "expected_output": The value that the user's function is expected to return for the given `input_args`.
 #       - "name": (String, Optional) A descriptive name for the test case (e.g., "Edge case: empty list").
 #
+#   - "performance": (Dictionary, Optional) Makes the question performance-graded. Once all test cases
+#                    pass, the user's function is timed against a reference solution on stress inputs:
+#       - "reference_solution": (String) Source code defining a function named like "function_name".
+#       - "stress_inputs": (Callable) Returns a list of `input_args` lists. Called once, on first use.
+#       - "max_time_ratio": (Float, Optional) Allowed multiple of the reference's best time (default 3.0).
+#       - "repeats": (Integer, Optional) Timed runs per stress input; the best run counts (default 3).
+#       - "min_reference_seconds": (Float, Optional) Floor applied to very fast reference times (default 0.001).
+#       - "timeout_seconds": (Integer, Optional) Wall-clock limit for the whole grading run (default 5).
+#
 # Fields specific to Multiple Choice Questions ("language": "mcq"):
 #   - "options": (List of Strings) The list of choices for the MCQ.
 #   - "correct_answer_index": (Integer) The 0-based index of the correct option in the "options" list.
 
+import random # For generating reproducible stress inputs of performance-graded questions
+
+
+def _pair_sum_stress_inputs():
+    """
+    Stress inputs for "Pair With Target Sum": large lists of even numbers with an odd target,
+    so no pair exists and every solution has to examine the whole input (worst case).
+    Sized so the reference takes well over the 1 ms min_reference_seconds floor (roughly 10-30 ms),
+    otherwise the floor rather than max_time_ratio would set the budget.
+    """
+    rng = random.Random(2024) # Fixed seed: every worker generates identical inputs
+    return [
+        [[rng.randrange(0, 10**9, 2) for _ in range(n)], 10**9 + 1]
+        for n in (50_000, 100_000)
+    ]
+
+
+def _orders_fixture(cursor):
+    """
+    Fixture for "Fast Lookup of a Customer's Orders": 50,000 orders spread over 5,000 customers.
+    """
+    rng = random.Random(2024) # Fixed seed: every worker generates identical data
+    cursor.executemany(
+        "INSERT INTO Orders (OrderID, CustomerID, Amount) VALUES (?, ?, ?)",
+        ((order_id, rng.randrange(1, 5001), rng.randrange(100, 100000) / 100) for order_id in range(1, 50001))
+    )
+
+
 QUESTIONS = [
     {
         "id": 1,
@@ -173,6 +228,33 @@ INSERT INTO Products (ProductID, ProductName, Price) VALUES (5, 'Ikura', 31.00);
         "time_limit_seconds": 400,
         "remarks": "Common task: Debugging existing SQL queries. Asked in XYZ Corp 2024."
     },
+    # Performance-graded SQL question: correct answers must also use an index
+    {
+        "id": 24,
+        "challenge_id": "sql_basics",
+        "title": "Fast Lookup of a Customer's Orders",
+        "level": "Hard",
+        "language": "sql",
+        "description": "The 'Orders' table holds 50,000 rows. Return 'OrderID' and 'Amount' of all orders placed by the customer with CustomerID 4242, ordered by 'OrderID'. Your query must not scan the whole table: you may start your submission with CREATE INDEX statements, followed by your SELECT query.",
+        "schema": """
+CREATE TABLE Orders (
+    OrderID INTEGER PRIMARY KEY,
+    CustomerID INT,
+    Amount DECIMAL(10,2)
+);
+    """,
+        "expected_query_output": "SELECT OrderID, Amount FROM Orders WHERE CustomerID = 4242 ORDER BY OrderID;",
+        "performance": {
+            "fixture": _orders_fixture,
+            "reference_setup": "CREATE INDEX idx_reference_orders_customer ON Orders (CustomerID);",
+            "max_steps_ratio": 3.0,
+            "forbid_full_scan": ["Orders"],
+            "allow_index_creation": True,
+        },
+        "points": 25,
+        "time_limit_seconds": 600,
+        "remarks": "Indexing and query plans. Graded on VM steps and EXPLAIN QUERY PLAN, not only on the result."
+    },
     # New Multiple Choice Questions (MCQs)
     {
         "id": 20,
@@ -218,6 +300,7 @@ INSERT INTO Products (ProductID, ProductName, Price) VALUES (5, 'Ikura', 31.00);
         "language": "python",
         "description": "Write a Python function `sum_two(a, b)` that returns the sum of two numbers.",
         "starter_code": "def sum_two(a, b):\n    # Your code here\n    pass",
+        "function_name": "sum_two",
         "test_cases": [
             {"input_args": [1, 2], "expected_output": 3, "name": "Positive numbers"},
             {"input_args": [-1, 1], "expected_output": 0, "name": "Negative and positive"},
@@ -226,6 +309,41 @@ INSERT INTO Products (ProductID, ProductName, Price) VALUES (5, 'Ikura', 31.00);
         "points": 10,
         "time_limit_seconds": 180,
         "remarks": "A very basic Python coding warm-up. Good for checking syntax understanding."
+    },
+    # Performance-graded Python question: correct but quadratic solutions fail the time budget
+    {
+        "id": 23,
+        "challenge_id": "python_performance",
+        "title": "Pair With Target Sum",
+        "level": "Medium",
+        "language": "python",
+        "description": "Write a Python function `has_pair_with_sum(nums, target)` that returns True if two numbers at different positions in `nums` add up to `target`, and False otherwise. Your solution must run in O(n log n) time or better; it is timed against a reference solution on large inputs.",
+        "starter_code": "def has_pair_with_sum(nums, target):\n    # Your code here\n    pass",
+        "function_name": "has_pair_with_sum",
+        "test_cases": [
+            {"input_args": [[1, 4, 6, 9], 10], "expected_output": True, "name": "Pair exists"},
+            {"input_args": [[1, 4, 6, 9], 12], "expected_output": False, "name": "No pair"},
+            {"input_args": [[5], 10], "expected_output": False, "name": "Single element cannot pair with itself"},
+            {"input_args": [[5, 5], 10], "expected_output": True, "name": "Duplicate values"},
+            {"input_args": [[], 0], "expected_output": False, "name": "Empty list"},
+        ],
+        "performance": {
+            "reference_solution": (
+                "def has_pair_with_sum(nums, target):\n"
+                "    seen = set()\n"
+                "    for x in nums:\n"
+                "        if target - x in seen:\n"
+                "            return True\n"
+                "        seen.add(x)\n"
+                "    return False\n"
+            ),
+            "stress_inputs": _pair_sum_stress_inputs,
+            "max_time_ratio": 5.0, # Generous enough for any O(n log n) approach, e.g. sorting + two pointers
+            "timeout_seconds": 10,
+        },
+        "points": 20,
+        "time_limit_seconds": 600,
+        "remarks": "Efficiency matters: nested loops will pass the examples but fail the stress tests."
     }
     # Ensure ID 6 from README example is distinct or updated. Assuming original question ID 6 (Sum of two numbers) might be like the one above.
     # Let's assume there was a Python challenge "python_advanced_problems".
@@ -0,0 +1,163 @@
+# coding_platform_flask/request_profiler.py
+
+# Opt-in sampling profiler for individual slow requests.
+#
+# When enabled (PROFILE_DIR environment variable, see app.py), a request is profiled if it is picked
+# by the sample rate (PROFILE_SAMPLE_RATE, 0 to 1) or if it carries the header
+# `X-Profile-Request: <PROFILE_TOKEN>`. While at least one request is profiled, a single background
+# thread samples the Python stacks of the profiled request threads every SAMPLE_INTERVAL_SECONDS
+# (sys._current_frames), so the request itself runs uninstrumented. Afterwards the samples are
+# written as collapsed stacks ("outer;inner;leaf count" lines, the input format of flamegraph tools)
+# if the request was slower than PROFILE_SLOW_MS, or always when it was requested by header.
+# Profiles live in a bounded on-disk ring buffer: only the newest `max_profiles` files are kept.
+# They can only be listed over HTTP with the token; without a token they are only written to disk.
+#
+# When PROFILE_DIR is not set no hooks are installed at all; a sampled-out request costs one
+# random() call.
+
+import collections # Sample counts per stack
+import hmac # Constant-time token comparison
+import os # Profile files
+import random # Request sampling
+import re # Sanitizing file name parts
+import sys # sys._current_frames for stack sampling
+import threading # Sampler thread
+import time # Request timing and file names
+
+import flask # Request context and hooks
+
+SAMPLE_INTERVAL_SECONDS = 0.005 # Time between stack samples of a profiled request
+PROFILE_HEADER = 'X-Profile-Request' # Header forcing a profile (its value must match the token)
+PROFILE_SUFFIX = '.collapsed'
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler:
+    """
+    Background thread sampling the stacks of registered threads. It only runs while
+    at least one thread is registered and waits idle otherwise.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self._samples = {} # thread id -> Counter of collapsed stacks
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._condition:
+            self._samples[thread_id] = collections.Counter()
+            if self._thread is None: # Started on first use
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def stop(self, thread_id):
+        """Stops sampling a thread and returns its Counter of collapsed stacks."""
+        with self._condition:
+            return self._samples.pop(thread_id, collections.Counter())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._condition:
+                while not self._samples:
+                    self._condition.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._condition:
+                for thread_id, counts in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is None or thread_id == own_id:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    counts[";".join(reversed(stack))] += 1
+
+
+class RequestProfiler:
+    """
+    Profiles sampled or explicitly requested requests of a Flask app into a directory.
+    :param app: The Flask application.
+    :param directory: Where profile files are written (created if missing).
+    :param sample_rate: Share of requests to profile (0 disables sampling; the header still works).
+    :param slow_ms: Sampled requests faster than this are discarded.
+    :param max_profiles: Number of profile files kept (at least 1); the oldest are deleted first.
+    :param token: Value of the X-Profile-Request header that forces a profile (None disables the header).
+    :raises ValueError: If max_profiles is below 1.
+    """
+    def __init__(self, app, directory, sample_rate=0.0, slow_ms=500, max_profiles=50, token=None):
+        if max_profiles < 1:
+            raise ValueError(f"max_profiles must be at least 1 (got {max_profiles}).")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.max_profiles = max_profiles
+        self.token = token
+        self._sampler = _StackSampler(SAMPLE_INTERVAL_SECONDS)
+        self._files_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def is_authorized(self, request):
+        """Returns True if the request carries the profiling token (used to protect the profile listing too)."""
+        return self.token is not None and hmac.compare_digest(request.headers.get(PROFILE_HEADER, ''), self.token)
+
+    def _before_request(self):
+        request = flask.request
+        if request.endpoint == 'static':
+            return
+        forced = self.is_authorized(request)
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return
+        flask.g._profile = (time.perf_counter(), forced)
+        self._sampler.start(threading.get_ident())
+
+    def _teardown_request(self, exception):
+        profile = flask.g.pop('_profile', None)
+        if profile is None:
+            return
+        started, forced = profile
+        counts = self._sampler.stop(threading.get_ident())
+        duration_ms = (time.perf_counter() - started) * 1000
+        if forced or duration_ms >= self.slow_ms:
+            self._save(counts, duration_ms)
+
+    def _label(self):
+        # Endpoint, plus the question for evaluations so slow questions can be told apart
+        request = flask.request
+        label = request.endpoint or "unknown"
+        if request.is_json:
+            question_id = (request.get_json(silent=True) or {}).get('question_id')
+            if question_id is not None:
+                label += f"-q{question_id}"
+        return _UNSAFE.sub("_", label)
+
+    def _save(self, counts, duration_ms):
+        name = f"{int(time.time() * 1000):015d}-{self._label()}-{int(duration_ms)}ms{PROFILE_SUFFIX}"
+        lines = "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+        with self._files_lock:
+            with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+                f.write(lines)
+            for old in self._profile_names()[:-self.max_profiles]: # Ring buffer: drop the oldest
+                os.remove(os.path.join(self.directory, old))
+
+    def _profile_names(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(PROFILE_SUFFIX))
+
+    def list_profiles(self):
+        """Returns the stored profiles, newest first, as dictionaries with 'name', 'bytes' and 'created'."""
+        with self._files_lock:
+            names = self._profile_names()
+            profiles = []
+            for name in reversed(names):
+                stat = os.stat(os.path.join(self.directory, name))
+                profiles.append({"name": name, "bytes": stat.st_size, "created": stat.st_mtime})
+        return profiles
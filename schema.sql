@@ -9,4 +9,26 @@ CREATE TABLE scoreboard (
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX IF NOT EXISTS idx_scoreboard_challenge_score_time ON scoreboard (challenge_id, score DESC, time_taken_seconds ASC);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_scoreboard_challenge_score_time ON scoreboard (challenge_id, score DESC, time_taken_seconds ASC);
+
+-- Per-challenge analytics rollups, maintained on every scoreboard insert (see scoreboard_rollups.py).
+DROP TABLE IF EXISTS challenge_rollup;
+CREATE TABLE challenge_rollup (
+    challenge_id TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    score_sum INTEGER NOT NULL,
+    score_min INTEGER NOT NULL,
+    score_max INTEGER NOT NULL,
+    time_sum INTEGER NOT NULL,
+    time_min INTEGER NOT NULL,
+    time_max INTEGER NOT NULL
+);
+
+DROP TABLE IF EXISTS challenge_rollup_bucket;
+CREATE TABLE challenge_rollup_bucket (
+    challenge_id TEXT NOT NULL,
+    kind TEXT NOT NULL, -- 'score' (10% steps of the max score) or 'time' (see TIME_BUCKET_BOUNDS)
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (challenge_id, kind, bucket)
+);
\ No newline at end of file
@@ -0,0 +1,183 @@
+# coding_platform_flask/scoreboard_rollups.py
+
+# Precomputed per-challenge analytics for the scoreboard.
+#
+# The `scoreboard` table only holds raw rows, so statistics computed from it would need a full
+# scan per request. Instead, every time a score is recorded the matching rollup rows are updated
+# in the same transaction:
+#   - challenge_rollup: attempt count, score sum/min/max and time sum/min/max per challenge.
+#   - challenge_rollup_bucket: histogram counts per challenge, for two kinds of buckets:
+#       'score': the score as a percentage of the challenge's maximum, in 10% steps (0-9);
+#       'time':  the time taken, bucketed by TIME_BUCKET_BOUNDS.
+# Reading analytics then touches a fixed number of rows (one rollup row plus at most
+# 10 + len(TIME_BUCKET_BOUNDS) + 1 buckets), and time percentiles are interpolated from the
+# time histogram, so serving them costs the same however many scores were recorded.
+
+import bisect # Locating the time bucket of a value
+import functools # Caching each challenge's maximum score
+import threading # Guards the one-time schema check
+
+import questions_data # For computing each challenge's maximum possible score
+
+SCORE_BUCKETS = 10 # Score histogram buckets: 0-9%, 10-19%, ..., 90-100% of the maximum score
+TIME_BUCKET_BOUNDS = [30, 60, 120, 180, 300, 450, 600, 900, 1200, 1800, 2700, 3600, 5400, 7200] # Upper bounds (s)
+PERCENTILES = (25, 50, 75, 90, 95) # Time percentiles reported by get_analytics
+
+# Kept in sync with schema.sql; applied with IF NOT EXISTS so databases created before the
+# rollup tables existed keep working (run 'flask rebuild-rollups' to backfill them).
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS challenge_rollup (
+    challenge_id TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    score_sum INTEGER NOT NULL,
+    score_min INTEGER NOT NULL,
+    score_max INTEGER NOT NULL,
+    time_sum INTEGER NOT NULL,
+    time_min INTEGER NOT NULL,
+    time_max INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS challenge_rollup_bucket (
+    challenge_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (challenge_id, kind, bucket)
+);
+"""
+
+_schema_checked = False
+_schema_lock = threading.Lock()
+
+
+def ensure_schema(db):
+    """Creates the rollup tables if they are missing (checked once per process)."""
+    global _schema_checked
+    if _schema_checked:
+        return
+    with _schema_lock:
+        if not _schema_checked:
+            db.executescript(ROLLUP_SCHEMA)
+            _schema_checked = True
+
+
+@functools.lru_cache(maxsize=None)
+def max_score(challenge_id):
+    """Returns the maximum achievable score of a challenge (sum of its questions' points). Questions are static, so cached."""
+    return sum(q['points'] for q in questions_data.QUESTIONS if q.get('challenge_id') == challenge_id)
+
+
+def score_bucket(score, challenge_max_score):
+    """Returns the score histogram bucket (0 to SCORE_BUCKETS - 1) for a score."""
+    if challenge_max_score <= 0:
+        return 0
+    return max(0, min(SCORE_BUCKETS - 1, score * SCORE_BUCKETS // challenge_max_score))
+
+
+def time_bucket(seconds):
+    """Returns the time histogram bucket for a duration; the last bucket holds everything above the last bound."""
+    return bisect.bisect_right(TIME_BUCKET_BOUNDS, seconds) # Bucket i covers [bound i-1, bound i)
+
+
+def apply_score(db, challenge_id, score, time_taken_seconds, challenge_max_score=None):
+    """
+    Adds one recorded score to the rollups. Does not commit: call it inside the same
+    transaction as the scoreboard INSERT so raw rows and rollups never disagree.
+    :param db: An open sqlite3 connection to the scoreboard database.
+    :param challenge_max_score: Optional precomputed max_score(challenge_id) (used by rebuilds).
+    """
+    if challenge_max_score is None:
+        challenge_max_score = max_score(challenge_id)
+    db.execute("""
+        INSERT INTO challenge_rollup (challenge_id, attempts, score_sum, score_min, score_max, time_sum, time_min, time_max)
+        VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (challenge_id) DO UPDATE SET
+            attempts = attempts + 1,
+            score_sum = score_sum + excluded.score_sum,
+            score_min = MIN(score_min, excluded.score_min),
+            score_max = MAX(score_max, excluded.score_max),
+            time_sum = time_sum + excluded.time_sum,
+            time_min = MIN(time_min, excluded.time_min),
+            time_max = MAX(time_max, excluded.time_max)
+    """, (challenge_id, score, score, score, time_taken_seconds, time_taken_seconds, time_taken_seconds))
+    bucket_upsert = """
+        INSERT INTO challenge_rollup_bucket (challenge_id, kind, bucket, count) VALUES (?, ?, ?, 1)
+        ON CONFLICT (challenge_id, kind, bucket) DO UPDATE SET count = count + 1
+    """
+    db.execute(bucket_upsert, (challenge_id, 'score', score_bucket(score, challenge_max_score)))
+    db.execute(bucket_upsert, (challenge_id, 'time', time_bucket(time_taken_seconds)))
+
+
+def rebuild(db):
+    """
+    Recomputes all rollups from the raw `scoreboard` rows (one full scan) and commits.
+    :return: Number of scoreboard rows processed.
+    """
+    ensure_schema(db)
+    max_scores = {}
+    db.execute("DELETE FROM challenge_rollup")
+    db.execute("DELETE FROM challenge_rollup_bucket")
+    rows = db.execute("SELECT challenge_id, score, time_taken_seconds FROM scoreboard").fetchall()
+    for challenge_id, score, time_taken_seconds in rows:
+        if challenge_id not in max_scores:
+            max_scores[challenge_id] = max_score(challenge_id)
+        apply_score(db, challenge_id, score, time_taken_seconds, max_scores[challenge_id])
+    db.commit()
+    return len(rows)
+
+
+def _time_percentile(counts, total, percentile, time_min, time_max):
+    # Walks the cumulative histogram to the bucket holding the requested rank,
+    # then interpolates linearly inside that bucket's range (clamped to the observed min/max).
+    rank = percentile / 100 * total
+    cumulative = 0
+    for bucket in range(len(TIME_BUCKET_BOUNDS) + 1):
+        count = counts.get(bucket, 0)
+        if count and cumulative + count >= rank:
+            low = TIME_BUCKET_BOUNDS[bucket - 1] if bucket > 0 else 0
+            high = TIME_BUCKET_BOUNDS[bucket] if bucket < len(TIME_BUCKET_BOUNDS) else time_max
+            low, high = max(low, time_min), min(high, time_max)
+            return round(low + (high - low) * (rank - cumulative) / count, 1)
+        cumulative += count
+    return time_max
+
+
+def get_analytics(db, challenge_id):
+    """
+    Reads a challenge's analytics from the rollups (a fixed number of rows, no scoreboard scan).
+    :return: A JSON-serializable dictionary; 'attempts' is 0 if no scores were recorded yet.
+    """
+    ensure_schema(db)
+    rollup = db.execute("SELECT attempts, score_sum, score_min, score_max, time_sum, time_min, time_max "
+                        "FROM challenge_rollup WHERE challenge_id = ?", (challenge_id,)).fetchone()
+    challenge_max_score = max_score(challenge_id)
+    if rollup is None:
+        return {"challenge_id": challenge_id, "attempts": 0, "max_possible_score": challenge_max_score}
+
+    attempts, score_sum, score_min, score_max, time_sum, time_min, time_max = rollup
+    buckets = {'score': {}, 'time': {}}
+    for kind, bucket, count in db.execute("SELECT kind, bucket, count FROM challenge_rollup_bucket "
+                                          "WHERE challenge_id = ?", (challenge_id,)):
+        buckets[kind][bucket] = count
+
+    score_histogram = [
+        {"label": f"{i * 100 // SCORE_BUCKETS}-{(i + 1) * 100 // SCORE_BUCKETS}%", "count": buckets['score'].get(i, 0)}
+        for i in range(SCORE_BUCKETS)
+    ]
+    time_labels = ([f"<{TIME_BUCKET_BOUNDS[0]}s"] +
+                   [f"{low}-{high}s" for low, high in zip(TIME_BUCKET_BOUNDS, TIME_BUCKET_BOUNDS[1:])] +
+                   [f">{TIME_BUCKET_BOUNDS[-1]}s"])
+    time_histogram = [{"label": label, "count": buckets['time'].get(i, 0)} for i, label in enumerate(time_labels)]
+
+    return {
+        "challenge_id": challenge_id,
+        "attempts": attempts,
+        "max_possible_score": challenge_max_score,
+        "score": {"mean": round(score_sum / attempts, 2), "min": score_min, "max": score_max},
+        "time_seconds": {
+            "mean": round(time_sum / attempts, 1), "min": time_min, "max": time_max,
+            "percentiles": {f"p{p}": _time_percentile(buckets['time'], attempts, p, time_min, time_max)
+                            for p in PERCENTILES},
+        },
+        "score_histogram": score_histogram,
+        "time_histogram": time_histogram,
+    }
@@ -0,0 +1,337 @@
+# coding_platform_flask/sql_grading.py
+
+# Helpers for evaluating SQL submissions (used by `evaluate_sql` in app.py).
+#
+# Fixture templates:
+#   Each SQL question's schema (plus, for performance-graded questions, a generated fixture that
+#   may hold many thousands of rows) is loaded once into an in-memory "template" database.
+#   Every submission then gets a private copy of that template through SQLite's backup API,
+#   which copies pages directly instead of re-running the schema script.
+#
+# Connection pool:
+#   Copying the template still costs a connect + backup per submission, so evaluation connections
+#   are pooled per question and reused. Each checkout runs inside a transaction that is always
+#   rolled back, with `PRAGMA query_only` enabled for read-only questions and an authorizer that
+#   stops user SQL from ending that transaction, changing pragmas or attaching databases. Read-only
+#   introspection pragmas (e.g. `SELECT * FROM pragma_table_info('Customers')`) remain available.
+#   A connection on which DDL was prepared (the authorizer sees every CREATE/DROP/ALTER) or whose
+#   transaction was ended early is closed instead of being returned to the pool.
+#
+# Efficiency metrics:
+#   - VM steps: SQLite calls the progress handler every STEP_GRANULARITY virtual machine
+#     instructions; counting those calls gives a deterministic, machine-independent measure of
+#     how much work a query did. The same handler aborts queries that exceed a hard step limit.
+#   - Query plan: `EXPLAIN QUERY PLAN` shows, per table, whether SQLite scans it in full
+#     ("SCAN") or looks rows up through an index or the primary key ("SEARCH").
+
+import re # Parsing EXPLAIN QUERY PLAN details and recognizing allowed setup statements
+import sqlite3 # Evaluation databases
+import threading # Guards the shared template connections
+
+STEP_GRANULARITY = 10 # VM instructions between progress handler calls (step counts are rounded to this)
+DEFAULT_MAX_STEPS_RATIO = 3.0 # Allowed multiple of the reference query's VM steps
+HARD_STEP_LIMIT_FACTOR = 20 # Queries are aborted once they exceed this multiple of their step budget...
+HARD_STEP_LIMIT_MIN = 5_000_000 # ...but never below this, so merely inefficient queries still get measured
+
+POOL_SIZE = 4 # Idle evaluation connections kept per question
+
+_templates = {} # question id -> template connection with schema and fixture loaded
+_templates_lock = threading.Lock()
+_reference_steps = {} # question id -> VM steps of the reference query (deterministic, so cached)
+_pools = {} # question id -> list of idle _PooledConnection
+_pools_lock = threading.Lock()
+_pool_stats = {"created": 0, "reused": 0, "discarded": 0}
+
+# Statement types user SQL may never perform on a pooled connection
+_DENIED_ACTIONS = {sqlite3.SQLITE_TRANSACTION, sqlite3.SQLITE_SAVEPOINT, sqlite3.SQLITE_ATTACH,
+                   sqlite3.SQLITE_DETACH, sqlite3.SQLITE_PRAGMA}
+# Pragmas that only report schema information; allowed both as statements and as table-valued
+# functions (the authorizer sees both forms as SQLITE_PRAGMA with the pragma's name)
+_INTROSPECTION_PRAGMAS = {'table_info', 'table_xinfo', 'table_list', 'index_list', 'index_info',
+                          'index_xinfo', 'foreign_key_list', 'collation_list', 'function_list',
+                          'module_list', 'pragma_list'}
+# Statement types that alter the schema; a connection that prepared any of them is discarded
+_DDL_ACTIONS = {getattr(sqlite3, name) for name in dir(sqlite3)
+                if name.startswith(('SQLITE_CREATE_', 'SQLITE_DROP_')) or name == 'SQLITE_ALTER_TABLE'}
+
+_PLAN_DETAIL = re.compile(r"^(SCAN|SEARCH)(?: TABLE)? (.+?)((?: USING | VIRTUAL TABLE | \().*)?$")
+# A table reference in a FROM clause, JOIN or comma-separated table list, with its optional alias.
+# Matches in other places (e.g. select lists) only map names the plan never shows, so they are harmless;
+# the lookahead lets them overlap, so `SELECT a, b FROM t x` still finds `t x`.
+_TABLE_REFERENCE = re.compile(
+    r'(?=(?:\bFROM|\bJOIN|,)\s+((?:\w+\.)?(?:"[^"]+"|`[^`]+`|\[[^\]]+\]|\w+))(?:\s+(?:AS\s+)?("[^"]+"|`[^`]+`|\[[^\]]+\]|\w+))?)',
+    re.IGNORECASE)
+_CREATE_INDEX = re.compile(r"^\s*CREATE\s+(UNIQUE\s+)?INDEX\b", re.IGNORECASE)
+
+
+class StepLimitExceeded(Exception):
+    """Raised when a query is aborted for exceeding its VM step limit."""
+
+
+def _build_template(question_data):
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    if question_data.get('schema'):
+        conn.executescript(question_data['schema'])
+    fixture = (question_data.get('performance') or {}).get('fixture')
+    if fixture:
+        fixture(conn.cursor()) # Generates the (possibly large) data set
+    conn.commit()
+    return conn
+
+
+def open_connection(question_data):
+    """
+    Returns a new private in-memory database holding the question's schema and fixture data.
+    The template is built on first use and copied for every call.
+    :param question_data: A SQL question dictionary.
+    :return: A sqlite3 connection owned by the caller (close it when done).
+    """
+    # Autocommit mode: evaluation_connection manages transactions explicitly.
+    # Pooled connections move between request threads, but only one uses them at a time.
+    conn = sqlite3.connect(':memory:', isolation_level=None, check_same_thread=False)
+    with _templates_lock:
+        template = _templates.get(question_data['id'])
+        if template is None:
+            template = _templates[question_data['id']] = _build_template(question_data)
+        template.backup(conn)
+    return conn
+
+
+def is_read_only(question_data):
+    """
+    Returns True if submissions of this question may not modify the database (the default).
+    Questions opt out with "read_only": False; questions allowing CREATE INDEX are never read-only.
+    """
+    if (question_data.get('performance') or {}).get('allow_index_creation'):
+        return False
+    return question_data.get('read_only', True)
+
+
+class _PooledConnection:
+    """
+    An evaluation connection plus the authorizer guarding it. The authorizer stays installed for
+    the connection's lifetime but only restricts statements while `guarded` is set (i.e. while
+    user SQL may run), and records whether any DDL was prepared so the connection can be discarded.
+    """
+    def __init__(self, question_data, read_only):
+        self.conn = open_connection(question_data)
+        if read_only:
+            self.conn.execute("PRAGMA query_only = ON") # Stays on: user SQL can never change pragmas
+        self.guarded = False
+        self.saw_ddl = False
+        self.conn.set_authorizer(self._authorize)
+
+    def _authorize(self, action, arg1, arg2, db_name, trigger):
+        if not self.guarded:
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_PRAGMA and arg1 and arg1.lower() in _INTROSPECTION_PRAGMAS:
+            return sqlite3.SQLITE_OK
+        if action in _DENIED_ACTIONS:
+            return sqlite3.SQLITE_DENY
+        if action in _DDL_ACTIONS:
+            self.saw_ddl = True
+        return sqlite3.SQLITE_OK
+
+
+class evaluation_connection:
+    """
+    Context manager checking out a pooled evaluation connection for one submission.
+    Inside the block, everything runs in a transaction that is rolled back on exit, so no
+    submission can observe another's changes. Usage:
+        with sql_grading.evaluation_connection(question_data) as conn:
+            ...
+    :param question_data: A SQL question dictionary.
+    """
+    def __init__(self, question_data):
+        self.question_data = question_data
+        self.pooled = None
+
+    def __enter__(self):
+        q_id = self.question_data['id']
+        with _pools_lock:
+            idle = _pools.get(q_id)
+            self.pooled = idle.pop() if idle else None
+            _pool_stats["reused" if self.pooled else "created"] += 1
+        if self.pooled is None:
+            self.pooled = _PooledConnection(self.question_data, is_read_only(self.question_data))
+        self.pooled.conn.execute("BEGIN")
+        self.pooled.guarded = True
+        return self.pooled.conn
+
+    def __exit__(self, exc_type, exc_value, tb):
+        pooled = self.pooled
+        pooled.guarded = False
+        try:
+            pooled.conn.set_progress_handler(None, 0)
+            transaction_intact = pooled.conn.in_transaction # Cannot be ended by user SQL, but verify anyway
+            pooled.conn.rollback()
+            reusable = transaction_intact and not pooled.saw_ddl # DDL is rolled back too, but discard to be safe
+        except sqlite3.Error:
+            reusable = False # E.g. the connection is in an unexpected state
+        self._release(reusable)
+        return False # Never suppress exceptions from the block
+
+    def _release(self, reusable):
+        q_id = self.question_data['id']
+        with _pools_lock:
+            idle = _pools.setdefault(q_id, [])
+            if reusable and len(idle) < POOL_SIZE:
+                idle.append(self.pooled)
+                return
+            if not reusable:
+                _pool_stats["discarded"] += 1
+        self.pooled.conn.close()
+
+
+def pool_stats():
+    """Returns counters of created, reused and discarded evaluation connections, and idle pool sizes."""
+    with _pools_lock:
+        return {**_pool_stats, "idle": {q_id: len(idle) for q_id, idle in _pools.items()}}
+
+
+def run_query(conn, query, step_limit=None):
+    """
+    Executes a single query while counting VM steps.
+    :param conn: The evaluation connection.
+    :param query: The SQL query to run.
+    :param step_limit: Optional number of steps after which the query is aborted.
+    :return: A tuple (rows, column_names, vm_steps).
+    :raises StepLimitExceeded: If the query was aborted at `step_limit`.
+    """
+    steps = 0
+
+    def on_progress():
+        nonlocal steps
+        steps += STEP_GRANULARITY
+        return 1 if step_limit is not None and steps > step_limit else 0 # Non-zero aborts the query
+
+    conn.set_progress_handler(on_progress, STEP_GRANULARITY)
+    try:
+        cursor = conn.execute(query)
+        rows = cursor.fetchall()
+    except sqlite3.OperationalError:
+        if step_limit is not None and steps > step_limit:
+            raise StepLimitExceeded(f"Query aborted after about {steps} VM steps.")
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+    return rows, columns, steps
+
+
+def _identifier(name):
+    # Unquoted, case-folded identifier without its schema prefix ('main."Orders"' -> 'orders')
+    schema, dot, rest = name.partition(".")
+    if dot and rest and re.fullmatch(r"\w+", schema):
+        name = rest
+    return name.strip('"`[]').casefold()
+
+
+def _table_names(conn, query):
+    """
+    Maps every name the query plan may show for a table (its own name in any case, or an alias
+    given in the query) to the real table names of the schema it may refer to.
+    """
+    tables = {name.casefold(): name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    names = {folded: {name} for folded, name in tables.items()}
+    for table, alias in _TABLE_REFERENCE.findall(query):
+        real = tables.get(_identifier(table))
+        if real and alias:
+            names.setdefault(_identifier(alias), set()).add(real) # Aliases may be reused for other tables
+    return names
+
+
+def query_plan(conn, query):
+    """
+    Summarizes `EXPLAIN QUERY PLAN` for a query.
+    The plan names tables the way the query does (`FROM Orders o` shows as "SCAN o", `FROM orders`
+    as "SCAN orders"), so names are mapped back to the schema's tables: aliases through the query's
+    FROM/JOIN clauses, other names case-insensitively. Names of subqueries and CTEs are kept as shown.
+    :return: A dictionary with the raw plan 'details', the tables read by a full 'scans',
+             and 'index_lookups' (tables searched through an index or the primary key).
+    """
+    details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()]
+    names = _table_names(conn, query)
+    scans, index_lookups = [], []
+    for detail in details:
+        match = _PLAN_DETAIL.match(detail)
+        if not match:
+            continue # e.g. "USE TEMP B-TREE FOR ORDER BY", subquery markers
+        kind, name, rest = match.groups(default="")
+        tables = sorted(names.get(_identifier(name), {name}))
+        if kind == "SCAN":
+            scans.extend(tables)
+        elif "INDEX" in rest or "PRIMARY KEY" in rest:
+            index_lookups.extend(tables)
+    return {"details": details, "scans": scans, "index_lookups": index_lookups}
+
+
+def split_statements(sql):
+    """
+    Splits a SQL script into complete statements (semicolons inside string literals are respected).
+    :return: List of statement strings without surrounding whitespace.
+    """
+    statements, buffer = [], ""
+    for char in sql:
+        buffer += char
+        if char == ";" and sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+
+def split_setup(user_sql, allow_index_creation):
+    """
+    Separates optional leading CREATE INDEX statements from the query to be graded.
+    :param user_sql: The user's submission.
+    :param allow_index_creation: Whether the question lets users create indexes before their query.
+    :return: A tuple (setup_statements, query).
+    :raises ValueError: If statements other than CREATE INDEX precede the query.
+    """
+    if not allow_index_creation:
+        return [], user_sql
+    statements = split_statements(user_sql)
+    if not statements:
+        return [], user_sql
+    setup, query = statements[:-1], statements[-1]
+    for statement in setup:
+        if not _CREATE_INDEX.match(statement):
+            raise ValueError("Only CREATE INDEX statements may precede your query.")
+    return setup, query
+
+
+def reference_steps(question_data):
+    """
+    Returns the VM steps taken by the question's expected query (after its optional
+    'reference_setup', e.g. the intended index) on a fresh copy of the fixture. Cached per question.
+    """
+    q_id = question_data['id']
+    if q_id not in _reference_steps:
+        settings = question_data['performance']
+        conn = open_connection(question_data)
+        try:
+            if settings.get('reference_setup'):
+                conn.executescript(settings['reference_setup'])
+            _reference_steps[q_id] = run_query(conn, question_data['expected_query_output'])[2]
+        finally:
+            conn.close()
+    return _reference_steps[q_id]
+
+
+def step_budget(question_data):
+    """
+    Returns the VM step budget for a performance-graded SQL question: its 'max_vm_steps' if set,
+    otherwise 'max_steps_ratio' (default DEFAULT_MAX_STEPS_RATIO) times the reference query's steps.
+    """
+    settings = question_data['performance']
+    if settings.get('max_vm_steps'):
+        return settings['max_vm_steps']
+    ratio = settings.get('max_steps_ratio', DEFAULT_MAX_STEPS_RATIO)
+    return max(STEP_GRANULARITY, int(reference_steps(question_data) * ratio))
+
+
+def hard_step_limit(budget):
+    """Returns the step count at which a query is aborted, given its step budget."""
+    return max(budget * HARD_STEP_LIMIT_FACTOR, HARD_STEP_LIMIT_MIN)
@@ -94,9 +94,10 @@ function handleFullscreenChange() {
 
 
 // --- Question Timer ---
-function startQuestionTimer(timeLimitSeconds) {
+function startQuestionTimer(timeLimitSeconds, elapsedSeconds = 0) {
     clearInterval(questionTimerInterval); // Clear any existing timer
-    currentQuestionStartTime = Math.floor(Date.now() / 1000);
+    // In contests the server reports time already spent on the question, whose clock keeps running
+    currentQuestionStartTime = Math.floor(Date.now() / 1000) - elapsedSeconds;
     const timerDisplay = document.getElementById('question-timer');
     const timeLimitDisplay = document.getElementById('time-limit');
 
@@ -169,16 +170,24 @@ function runCode() {
         submissionData = codeMirrorEditor.getValue();
     }
 
-    fetch('/api/evaluate', {
+    // MCQ answers take the fast path: graded against the precomputed answer key, without the grader queue
+    const isMcq = currentQuestionData.language === 'mcq';
+    const questionId = currentQuestionData.id;
+    fetch(isMcq ? '/api/evaluate_mcq_batch' : '/api/evaluate', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ code: submissionData, question_id: currentQuestionData.id })
+        body: JSON.stringify(isMcq
+            ? { answers: { [questionId]: Number(submissionData) } }
+            : { code: submissionData, question_id: questionId })
     })
     .then(response => response.json())
+    .then(data => isMcq ? singleMcqResult(data, questionId) : data)
     .then(data => {
         if (data.error) {
-            alert(`Evaluation Error: ${data.error}`);
-            document.getElementById('output-area').innerHTML = `<p class="text-danger">${data.error}</p>`;
+            // Admission control (429/503) responses carry a retry_after hint in seconds
+            const retryHint = data.retry_after ? ` Retry in ${data.retry_after}s.` : '';
+            alert(`Evaluation Error: ${data.error}${retryHint}`);
+            document.getElementById('output-area').innerHTML = `<p class="text-danger">${data.error}${retryHint}</p>`;
         } else {
             document.getElementById('output-area').innerHTML = data.output || '<p class="text-muted">No output received.</p>';
             if (data.new_score !== undefined) {
@@ -201,6 +210,15 @@ function runCode() {
     });
 }
 
+// Converts an /api/evaluate_mcq_batch response for one answer into the shape of an /api/evaluate response
+function singleMcqResult(data, questionId) {
+    if (data.error) return data;
+    if (data.expired && data.expired.length) return { error: "The time limit for this question has expired." };
+    const result = data.results && data.results[String(questionId)];
+    if (!result) return { error: "Invalid answer." };
+    return { ...result, new_score: data.new_score, qnp_data: data.qnp_data };
+}
+
 function navigateViaApi(endpoint, successCallback) {
     fetch(endpoint, { method: 'POST' })
     .then(response => response.json())
@@ -368,7 +386,7 @@ function updateQuestionDisplay(data) {
     progressBar.setAttribute('aria-valuenow', progressPercent);
     
     // Timer
-    startQuestionTimer(data.time_limit_seconds);
+    startQuestionTimer(data.time_limit_seconds, data.question_elapsed_seconds || 0);
     document.getElementById('output-area').innerHTML = '<p class="text-muted">Output will appear here.</p>'; // Clear previous output
 
     // Button visibility
@@ -0,0 +1,125 @@
+# coding_platform_flask/tests/test_admission.py
+
+# Tests for grader admission control (admission.py) and the operator-only stats endpoint.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import admission # noqa: E402  (imported after adjusting sys.path)
+import app # noqa: E402
+import request_profiler # noqa: E402
+
+
+def _controller(**overrides):
+    settings = {"max_concurrency": 1, "max_queue": 0, "queue_timeout": 1, "rate": 0.5, "burst": 2}
+    settings.update(overrides)
+    return admission.AdmissionController(**settings)
+
+
+def test_token_bucket_refills_over_time():
+    bucket = admission.TokenBucket(rate=2, capacity=1)
+    now = bucket.updated
+    assert bucket.try_take(now) == 0
+    assert bucket.try_take(now) == pytest.approx(0.5)
+    assert bucket.try_take(now + 0.5) == 0
+
+
+def test_burst_then_rate_limited():
+    controller = _controller(max_queue=5)
+    for _ in range(2):
+        assert controller.run("s1", "1", "code", lambda: "ok") == ("ok", False)
+    with pytest.raises(admission.AdmissionRejected) as rejected:
+        controller.run("s1", "1", "code", lambda: "ok")
+    assert rejected.value.reason == "rate_limited"
+    assert rejected.value.retry_after >= 1
+    # Buckets are per session
+    assert controller.run("s2", "1", "code", lambda: "ok") == ("ok", False)
+
+
+def test_identical_in_flight_submissions_are_coalesced():
+    controller = _controller(max_concurrency=2, max_queue=2)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def grade():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"passed_all_tests": True}
+
+    owner_result = []
+    owner = threading.Thread(target=lambda: owner_result.append(controller.run("s1", "7", "code", grade)))
+    owner.start()
+    assert started.wait(5)
+    duplicate = []
+    waiter = threading.Thread(target=lambda: duplicate.append(controller.run("s1", "7", "code", grade)))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while controller.stats()["coalesced"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert len(calls) == 1
+    assert owner_result == [({"passed_all_tests": True}, False)]
+    assert duplicate == [({"passed_all_tests": True}, True)]
+
+
+def test_overload_rejection_does_not_use_a_token():
+    controller = _controller(burst=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_grade():
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    busy = threading.Thread(target=controller.run, args=("other", "1", "a", slow_grade))
+    busy.start()
+    assert started.wait(5)
+    # The only slot is taken and the queue is full: shed without charging session "s1"
+    with pytest.raises(admission.AdmissionRejected) as rejected:
+        controller.run("s1", "1", "code", lambda: "ok")
+    assert rejected.value.reason == "overloaded"
+    release.set()
+    busy.join(5)
+
+    # "s1" still has its single burst token
+    assert controller.run("s1", "1", "code", lambda: "ok") == ("ok", False)
+    stats = controller.stats()
+    assert stats["rejected_overloaded"] == 1
+    assert stats["rejected_rate_limited"] == 0
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def test_admission_stats_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_TOKEN', None)
+    assert client.get('/api/admission_stats').status_code == 404
+
+
+def test_admission_stats_requires_token(client, monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_TOKEN', "operator-secret")
+    assert client.get('/api/admission_stats').status_code == 403
+    assert client.get('/api/admission_stats', headers={request_profiler.PROFILE_HEADER: "wrong"}).status_code == 403
+    response = client.get('/api/admission_stats', headers={request_profiler.PROFILE_HEADER: "operator-secret"})
+    assert response.status_code == 200
+    assert "queue_depth" in response.get_json()
+
+
+def test_new_session_gets_its_full_burst():
+    # A bucket created after the caller read the clock must not start below capacity
+    controller = _controller(burst=1)
+    assert controller.run("fresh", "1", "code", lambda: "ok") == ("ok", False)
@@ -0,0 +1,167 @@
+# coding_platform_flask/tests/test_contest.py
+
+# Tests for scheduled contests (contest.py and the contest paths of app.py).
+#
+# A username has one attempt per contest. Logging in again resumes it only with the attempt's
+# resume token, which the app keeps in the session cookie across restarts; a login under the same
+# name from another browser is refused instead of taking the attempt over. During a contest every
+# score the app reports comes from the server-side Participant, never from the session cookie.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import contest # noqa: E402
+import questions_data # noqa: E402
+
+CHALLENGE_ID = "sql_basics"
+SOLVED_ID = 3 # "Order Customers by Name"
+SOLVED_QUERY = questions_data.get_question_by_id(SOLVED_ID)['expected_query_output']
+POINTS = questions_data.get_question_by_id(SOLVED_ID)['points']
+
+
+@pytest.fixture
+def scheduler():
+    recorded = []
+    scheduler = contest.ContestScheduler(recorded.extend, lambda q_id: None)
+    scheduler.recorded = recorded
+    now = time.time()
+    scheduler.add_contest(contest.Contest(CHALLENGE_ID, now - 60, now + 3600))
+    return scheduler
+
+
+@pytest.fixture
+def running_contest(tmp_path, monkeypatch):
+    """Runs app.py with a live contest on CHALLENGE_ID and a fresh scoreboard database."""
+    monkeypatch.setattr(app, 'DATABASE', str(tmp_path / "scoreboard.db"))
+    app.init_db()
+    scheduler = contest.ContestScheduler(app._record_contest_scores, app._question_time_limit)
+    now = time.time()
+    scheduler.add_contest(contest.Contest(CHALLENGE_ID, now - 60, now + 3600))
+    monkeypatch.setattr(app, 'contest_scheduler', scheduler)
+    return scheduler
+
+
+def _login(client, username="Ada"):
+    return client.post('/', data={"username": username, "challenge_id": CHALLENGE_ID})
+
+
+def _solve(client):
+    return client.post('/api/evaluate', json={"question_id": SOLVED_ID, "code": SOLVED_QUERY}).get_json()
+
+
+def _finish(client):
+    for _ in questions_data.get_all_questions_metadata(CHALLENGE_ID):
+        response = client.post('/api/next_question').get_json()
+    return response
+
+
+def _session(client):
+    with client.session_transaction() as session:
+        return dict(session)
+
+
+def _scoreboard_rows():
+    db = sqlite3.connect(app.DATABASE)
+    try:
+        return db.execute("SELECT username, score FROM scoreboard").fetchall()
+    finally:
+        db.close()
+
+
+def test_resume_requires_the_token(scheduler):
+    participant, resumed = scheduler.join(CHALLENGE_ID, "session-1", "Ada")
+    assert not resumed
+    with pytest.raises(contest.ContestClosed, match="already taking part"):
+        scheduler.join(CHALLENGE_ID, "session-2", "ada") # Same name, case-insensitively
+    with pytest.raises(contest.ContestClosed, match="already taking part"):
+        scheduler.join(CHALLENGE_ID, "session-2", "Ada", resume_token="0" * 32)
+    assert scheduler.participant("session-2") is None
+
+    resumed_participant, resumed = scheduler.join(CHALLENGE_ID, "session-2", "Ada", resume_token=participant.resume_token)
+    assert resumed and resumed_participant is participant
+    assert scheduler.stats()["resume_refused"] == 2
+
+
+def test_finished_participant_cannot_rejoin_even_with_token(scheduler):
+    participant, _ = scheduler.join(CHALLENGE_ID, "session-1", "Ada")
+    assert scheduler.finish(participant)
+    with pytest.raises(contest.ContestClosed, match="already completed"):
+        scheduler.join(CHALLENGE_ID, "session-2", "Ada", resume_token=participant.resume_token)
+
+
+def test_question_is_credited_once(scheduler):
+    participant, _ = scheduler.join(CHALLENGE_ID, "session-1", "Ada")
+    scheduler.record_correct(participant, SOLVED_ID, POINTS)
+    scheduler.record_correct(participant, SOLVED_ID, POINTS)
+    assert participant.score == POINTS
+
+
+def test_finalize_contest_records_outstanding_participants_once(scheduler):
+    first, _ = scheduler.join(CHALLENGE_ID, "session-1", "Ada")
+    second, _ = scheduler.join(CHALLENGE_ID, "session-2", "Grace")
+    scheduler.record_correct(second, SOLVED_ID, POINTS)
+    assert scheduler.finish(first)
+    assert scheduler.finalize_contest(CHALLENGE_ID) == 1
+    assert scheduler.finalize_contest(CHALLENGE_ID) == 0
+    assert [(username, score) for username, _, score, _ in scheduler.recorded] == [("Grace", POINTS)]
+
+
+def test_restart_in_the_same_browser_resumes_the_attempt(running_contest):
+    client = app.app.test_client()
+    _login(client)
+    assert _solve(client)['new_score'] == POINTS
+    client.post('/restart_test')
+    _login(client)
+    question = client.get('/api/question').get_json()
+    assert question['user_score'] == POINTS
+    solved = next(entry for entry in question['qnp_data'] if entry['id'] == SOLVED_ID)
+    assert solved['status'] == "correct"
+    assert running_contest.stats()["contests"][CHALLENGE_ID]["participants"] == 1
+
+
+def test_other_browser_cannot_take_over_an_attempt(running_contest):
+    owner, intruder = app.app.test_client(), app.app.test_client()
+    _login(owner)
+    response = _login(intruder, "ada")
+    assert b"already taking part" in response.data
+    assert 'session_key' not in _session(intruder)
+    assert running_contest.stats()["contests"][CHALLENGE_ID]["participants"] == 1
+    assert _solve(owner)['new_score'] == POINTS # The owner's attempt is untouched
+
+
+def test_reported_scores_come_from_the_participant(running_contest):
+    first = app.app.test_client()
+    _login(first)
+    token = running_contest.participant(_session(first)['session_key']).resume_token
+    second = app.app.test_client()
+    with second.session_transaction() as session:
+        session['contest_tokens'] = {CHALLENGE_ID: token}
+    _login(second) # Second tab of the same participant, with its own session score of 0
+
+    assert _solve(first)['new_score'] == POINTS
+    assert second.get('/api/question').get_json()['user_score'] == POINTS
+    already = _solve(first)
+    assert already['status'] == "already_correct" and already['new_score'] == POINTS
+    assert _finish(second)['score'] == POINTS
+
+
+def test_finishing_records_one_row_per_username(running_contest):
+    client = app.app.test_client()
+    _login(client)
+    _solve(client)
+    client.post('/restart_test')
+    _login(client) # Resumed, not a second attempt
+    assert _finish(client)['score'] == POINTS
+    client.post('/restart_test')
+    assert b"already completed" in _login(client).data
+    running_contest.finalize_contest(CHALLENGE_ID)
+    assert _scoreboard_rows() == [("Ada", POINTS)]
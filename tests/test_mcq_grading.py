@@ -0,0 +1,94 @@
+# coding_platform_flask/tests/test_mcq_grading.py
+
+# Tests for batch MCQ grading (mcq_grading.AnswerKey and /api/evaluate_mcq_batch).
+#
+# The batch path must agree with single-answer grading (app.evaluate_mcq) on every kind of answer:
+# correct, incorrect, out of range, malformed and skipped.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import mcq_grading # noqa: E402
+import questions_data # noqa: E402
+
+CHALLENGE_ID = "python_basic_problems"
+MCQ_ID = 20 # "Python Variable Scope": 4 options, correct index 1
+
+
+def _question():
+    return questions_data.get_question_by_id(MCQ_ID)
+
+
+def _batch_verdict(answer):
+    graded = mcq_grading.get_answer_key(CHALLENGE_ID).grade_sheet({str(MCQ_ID): answer})
+    return [is_correct for q_id, _, is_correct in graded if q_id == MCQ_ID]
+
+
+@pytest.mark.parametrize("answer", ["1", "0", "3", "4", "7", "-1", "abc"])
+def test_batch_agrees_with_single_answer_grading(answer):
+    single = app.evaluate_mcq(answer, _question())['passed_all_tests']
+    assert _batch_verdict(answer) == [single]
+
+
+def test_out_of_range_answer_is_graded_incorrect():
+    assert _batch_verdict(len(_question()['options'])) == [False]
+
+
+def test_skipped_answer_is_not_graded():
+    assert _batch_verdict(None) == []
+    assert mcq_grading.get_answer_key(CHALLENGE_ID).grade_sheet({}) == []
+
+
+def test_unknown_question_is_ignored():
+    assert mcq_grading.get_answer_key(CHALLENGE_ID).grade_sheet({"99999": 0}) == []
+
+
+def test_score_sheets_counts_invalid_answers_as_attempted():
+    key = mcq_grading.get_answer_key(CHALLENGE_ID)
+    sheets = [{str(MCQ_ID): 1}, {str(MCQ_ID): 9}, {}]
+    for report in (key.score_sheets(sheets), key._score_matrix_python([key.encode_sheet(s) for s in sheets])):
+        stats = next(q for q in report['questions'] if q['question_id'] == MCQ_ID)
+        assert stats['attempted'] == 2
+        assert stats['correct'] == 1
+        assert sum(stats['option_counts']) == 1 # The invalid answer picked no option
+
+
+@pytest.fixture
+def client():
+    client = app.app.test_client()
+    client.post('/', data={"username": "mcq tester", "challenge_id": CHALLENGE_ID})
+    return client
+
+
+def _status(client, response):
+    return {item['id']: item['status'] for item in response.get_json()['qnp_data']}[MCQ_ID]
+
+
+@pytest.mark.parametrize("answer, expected_status", [(1, "correct"), (0, "incorrect"), (9, "incorrect")])
+def test_batch_endpoint_matches_evaluate_endpoint(answer, expected_status):
+    single_client = app.app.test_client()
+    single_client.post('/', data={"username": "mcq tester", "challenge_id": CHALLENGE_ID})
+    single = single_client.post('/api/evaluate', json={"question_id": MCQ_ID, "code": str(answer)})
+
+    batch_client = app.app.test_client()
+    batch_client.post('/', data={"username": "mcq tester", "challenge_id": CHALLENGE_ID})
+    batch = batch_client.post('/api/evaluate_mcq_batch', json={"answers": {str(MCQ_ID): answer}})
+
+    assert single.get_json()['passed_all_tests'] == batch.get_json()['results'][str(MCQ_ID)]['passed_all_tests']
+    assert _status(single_client, single) == _status(batch_client, batch) == expected_status
+    assert single.get_json().get('new_score', 0) == batch.get_json()['new_score']
+
+
+def test_batch_endpoint_skipped_answer_leaves_question_unattempted(client):
+    response = client.post('/api/evaluate_mcq_batch', json={"answers": {str(MCQ_ID): None}})
+    data = response.get_json()
+    assert data['graded'] == 0
+    assert data['ignored'] == 1
+    assert _status(client, response) == "unattempted"
@@ -0,0 +1,132 @@
+# coding_platform_flask/tests/test_performance_grading.py
+
+# Tests for performance-graded Python questions (python_submission.performance_payload /
+# time_budget, python_runner.py reference mode and app.evaluate_python).
+#
+# The reference solution is timed in a runner process of its own, so nothing a submission does
+# in its process (e.g. replacing builtins the reference relies on) can raise its own budget.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import python_submission # noqa: E402
+import questions_data # noqa: E402
+
+PAIR_SUM_ID = 23 # has_pair_with_sum(nums, target), timed on 50k / 100k element lists
+
+SORT_SOLUTION = """
+def has_pair_with_sum(nums, target):
+    values = sorted(nums)
+    i, j = 0, len(values) - 1
+    while i < j:
+        total = values[i] + values[j]
+        if total == target:
+            return True
+        if total < target:
+            i += 1
+        else:
+            j -= 1
+    return False
+"""
+
+QUADRATIC_SOLUTION = """
+def has_pair_with_sum(nums, target):
+    for i in range(len(nums)):
+        for j in range(i + 1, len(nums)):
+            if nums[i] + nums[j] == target:
+                return True
+    return False
+"""
+
+# Slows down every set() in its process (which the reference uses) and is itself slow on stress inputs
+SABOTAGE_SOLUTION = """
+import builtins
+import time
+
+class _SlowSet(set):
+    def __init__(self, *args):
+        time.sleep(0.3)
+        super().__init__(*args)
+
+_real_set = set
+builtins.set = _SlowSet
+
+def has_pair_with_sum(nums, target):
+    if len(nums) > 1000:
+        time.sleep(0.3)
+    seen = _real_set()
+    for x in nums:
+        if target - x in seen:
+            return True
+        seen.add(x)
+    return False
+"""
+
+
+def _question():
+    return questions_data.get_question_by_id(PAIR_SUM_ID)
+
+
+def _grade(code):
+    return app.evaluate_python(code, _question())
+
+
+def _reference_times(result):
+    return [float(ms) for ms in re.findall(r"Reference: ([\d.]+) ms", result['output'])]
+
+
+def test_reference_and_efficient_solutions_pass():
+    assert _grade(_question()['performance']['reference_solution'])['passed_all_tests']
+    assert _grade(SORT_SOLUTION)['passed_all_tests']
+
+
+def test_quadratic_solution_fails_the_budget():
+    result = _grade(QUADRATIC_SOLUTION)
+    assert not result['passed_all_tests']
+    assert "Within time budget" not in result['output']
+
+
+def test_submission_cannot_slow_down_the_reference():
+    result = _grade(SABOTAGE_SOLUTION)
+    assert not result['passed_all_tests']
+    reference_ms = _reference_times(result)
+    assert len(reference_ms) == 2
+    assert all(ms < 250 for ms in reference_ms) # Unaffected by the 0.3 s set() of the submission
+
+
+def test_reference_is_timed_in_its_own_process():
+    payload = python_submission.performance_payload(_question())
+    reference_times = app._time_reference_solution(payload, "has_pair_with_sum", 30)
+    assert len(reference_times) == len(payload["stress_inputs"])
+    assert all(len(times) == payload["repeats"] for times in reference_times)
+    # Stress inputs are sized well above the timer-resolution floor
+    assert all(min(times) > payload["min_reference_seconds"] for times in reference_times)
+
+
+def test_expected_outputs_come_from_the_reference():
+    payload = python_submission.performance_payload(_question())
+    assert len(payload["expected_outputs"]) == len(payload["stress_inputs"])
+
+
+@pytest.mark.parametrize("times, expected", [
+    ([0.010, 0.012, 0.011], 0.010 * 5.0 + 0.002),
+    ([0.0001, 0.0001, 0.0001], 0.001 * 5.0), # Floored at min_reference_seconds
+])
+def test_time_budget(times, expected):
+    payload = {"min_reference_seconds": 0.001, "max_time_ratio": 5.0}
+    assert python_submission.time_budget(times, payload) == pytest.approx(expected)
+
+
+def test_performance_question_has_its_own_challenge():
+    assert _question()['challenge_id'] == "python_performance"
+    assert "python_performance" in app.CHALLENGES
+    basics = questions_data.get_all_questions_metadata("python_basic_problems")
+    assert not any(questions_data.get_question_by_id(q['id']).get('performance') for q in basics)
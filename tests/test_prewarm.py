@@ -0,0 +1,60 @@
+# coding_platform_flask/tests/test_prewarm.py
+
+# Tests for cache prewarming (app.prewarm and the POST /api/prewarm operator endpoint).
+#
+# Prewarming does real grading work, so the endpoint requires the operator token. After it runs,
+# every SQL question must have an idle pooled evaluation connection, so the first submission
+# after a restart does not pay for building one.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import questions_data # noqa: E402
+import request_profiler # noqa: E402
+import sql_grading # noqa: E402
+
+TOKEN = "operator-secret"
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def test_prewarm_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_TOKEN', None)
+    assert client.post('/api/prewarm').status_code == 404
+
+
+def test_prewarm_requires_token(client, monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_TOKEN', TOKEN)
+    assert client.post('/api/prewarm').status_code == 403
+    assert client.post('/api/prewarm', headers={request_profiler.PROFILE_HEADER: "wrong"}).status_code == 403
+    response = client.post('/api/prewarm', headers={request_profiler.PROFILE_HEADER: TOKEN})
+    assert response.status_code == 200
+    assert response.get_json()["warmed"] is True
+
+
+def test_prewarm_fills_the_sql_connection_pool():
+    timings = app.prewarm()
+    assert "sql_connection_pool" in timings
+    idle = sql_grading.pool_stats()["idle"]
+    sql_ids = [q['id'] for q in questions_data.QUESTIONS if q['language'] == 'sql']
+    assert sql_ids and all(idle.get(q_id, 0) >= 1 for q_id in sql_ids)
+
+
+def test_prewarmed_connection_is_reused():
+    app.prewarm()
+    question = next(q for q in questions_data.QUESTIONS if q['language'] == 'sql')
+    before = sql_grading.pool_stats()
+    app.evaluate_sql(question['expected_query_output'], question)
+    after = sql_grading.pool_stats()
+    assert after["reused"] == before["reused"] + 1
+    assert after["created"] == before["created"]
@@ -0,0 +1,83 @@
+# coding_platform_flask/tests/test_python_runner.py
+
+# Tests for the Python grading protocol (app.evaluate_python and python_runner.py).
+#
+# Test cases travel to the runner as pickled data; results come back over a dedicated file
+# descriptor, never stdout. Submissions that print, forge a result payload on stdout or exit
+# before every test case ran must not pass.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import json
+import marshal
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import questions_data # noqa: E402
+
+SUM_TWO_ID = 22 # sum_two(a, b) with three test cases
+
+FORGED_RESULTS = json.dumps({
+    "tests": [{"passed": True, "actual": "3", "error": None, "seconds": 0.0}],
+    "performance": [],
+})
+
+
+def _grade(code):
+    return app.evaluate_python(code, questions_data.get_question_by_id(SUM_TWO_ID))
+
+
+def test_correct_solution_passes():
+    assert _grade("def sum_two(a, b):\n    return a + b\n")['passed_all_tests']
+
+
+def test_wrong_solution_fails():
+    assert not _grade("def sum_two(a, b):\n    return a - b\n")['passed_all_tests']
+
+
+def test_prints_do_not_affect_results():
+    code = "import os\nprint('noise')\nos.write(1, b'more noise')\ndef sum_two(a, b):\n    print(a)\n    return a + b\n"
+    assert _grade(code)['passed_all_tests']
+
+
+def test_forged_stdout_payload_and_early_exit_fail():
+    code = (
+        "import os\n"
+        f"os.write(1, {FORGED_RESULTS.encode()!r})\n"
+        "os._exit(0)\n"
+        "def sum_two(a, b):\n    return 0\n"
+    )
+    result = _grade(code)
+    assert not result['passed_all_tests']
+    assert "did not report a result for every test case" in result['output']
+
+
+def test_exit_during_tests_fails():
+    # Passes the first test case, then ends the process before the others run
+    code = "import os\ndef sum_two(a, b):\n    if a != 1:\n        os._exit(0)\n    return a + b\n"
+    assert not _grade(code)['passed_all_tests']
+
+
+def test_runner_reports_on_results_descriptor_only():
+    payload = pickle.dumps({
+        "bytecode": marshal.dumps(compile("def sum_two(a, b):\n    print('hi')\n    return a + b\n", "<submission>", "exec")),
+        "func_name": "sum_two",
+        "test_cases": [((1, 2), 3), ((2, 2), 5)],
+        "performance": None,
+    })
+    with tempfile.TemporaryFile() as results_file:
+        process = subprocess.run([sys.executable, app.PYTHON_RUNNER, str(results_file.fileno())], input=payload,
+                                 capture_output=True, pass_fds=(results_file.fileno(),), timeout=30)
+        results_file.seek(0)
+        results = json.loads(results_file.read())
+    assert process.returncode == 0
+    assert process.stdout == b""
+    assert [r["passed"] for r in results["tests"]] == [True, False]
+    assert results["tests"][1]["actual"] == "4"
+    assert results["performance"] == []
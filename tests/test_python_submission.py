@@ -0,0 +1,110 @@
+# coding_platform_flask/tests/test_python_submission.py
+
+# Tests for parent-side preparation of Python submissions (python_submission.py):
+# entry-point resolution, the compiled-code cache and the endless-loop warning.
+#
+# The loop check only ever warns: code that terminates (through an exception, a call or an
+# unused helper that is never run) must still be graded normally.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import python_submission # noqa: E402
+import questions_data # noqa: E402
+
+SUM_TWO_ID = 22
+
+STOP_ITERATION_LOOP = """
+def sum_two(a, b):
+    it = iter([a, b])
+    total = 0
+    try:
+        while True:
+            total += next(it)
+    except StopIteration:
+        return total
+"""
+
+LOOP_ENDED_BY_CALLEE = """
+def _take(items):
+    return items.pop()
+
+def sum_two(a, b):
+    items, total = [a, b], 0
+    try:
+        while True:
+            total += _take(items)
+    except IndexError:
+        return total
+"""
+
+UNUSED_ENDLESS_HELPER = """
+def spin():
+    while True:
+        pass
+
+def sum_two(a, b):
+    return a + b
+"""
+
+
+def _grade(code):
+    return app.evaluate_python(code, questions_data.get_question_by_id(SUM_TWO_ID))
+
+
+@pytest.mark.parametrize("code", [STOP_ITERATION_LOOP, LOOP_ENDED_BY_CALLEE, UNUSED_ENDLESS_HELPER])
+def test_terminating_code_is_graded_normally(code):
+    submission = python_submission.prepare(code)
+    assert submission.error is None
+    assert _grade(code)['passed_all_tests']
+
+
+def test_loops_that_may_raise_are_not_flagged():
+    assert python_submission.prepare(STOP_ITERATION_LOOP).warnings == []
+    assert python_submission.prepare(LOOP_ENDED_BY_CALLEE).warnings == []
+    assert python_submission.prepare("while True:\n    assert False\n").warnings == []
+    assert python_submission.prepare("import sys\nwhile True:\n    sys.exit(0)\n").warnings == []
+
+
+def test_endless_loop_is_a_warning_not_a_rejection():
+    submission = python_submission.prepare(UNUSED_ENDLESS_HELPER)
+    assert submission.bytecode is not None
+    assert len(submission.warnings) == 1
+    assert submission.warnings[0].startswith("Line 3:")
+    assert "Warning: Line 3:" in _grade(UNUSED_ENDLESS_HELPER)['output']
+
+
+def test_syntax_error_is_rejected():
+    submission = python_submission.prepare("def sum_two(a, b)\n    return a + b\n")
+    assert submission.bytecode is None
+    assert submission.check_entry_point("sum_two").startswith("SyntaxError on line 1")
+
+
+def test_missing_entry_point_is_reported():
+    submission = python_submission.prepare("def add(a, b):\n    return a + b\n")
+    assert submission.check_entry_point("sum_two") == "Function 'sum_two' is not defined at the top level of your code."
+
+
+def test_prepare_is_cached_by_source():
+    code = "def sum_two(a, b):\n    return b + a\n"
+    assert python_submission.prepare(code) is python_submission.prepare(code)
+
+
+def test_entry_point_falls_back_to_starter_code():
+    question = {"id": 900, "starter_code": "def solve(x):\n    pass\n"}
+    assert python_submission.entry_point_for(question) == "solve"
+
+
+def test_missing_entry_point_definition_is_a_configuration_error():
+    with pytest.raises(ValueError):
+        python_submission.entry_point_for({"id": 901, "starter_code": "# nothing here"})
+    result = app.evaluate_python("def f():\n    pass\n", {"id": 901, "starter_code": "", "test_cases": []})
+    assert result['status'] == "error"
+    assert "Function 'None'" not in result['output']
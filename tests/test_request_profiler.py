@@ -0,0 +1,85 @@
+# coding_platform_flask/tests/test_request_profiler.py
+
+# Tests for the opt-in sampling profiler (request_profiler.py) and the /api/profiles endpoints.
+#
+# The X-Profile-Request token both forces a profile and guards the profile listing, so it is
+# compared in constant time. The on-disk ring buffer must keep at least one profile: a limit of 0
+# is rejected instead of silently keeping every file.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sys
+
+import flask
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import request_profiler # noqa: E402
+
+TOKEN = "operator-secret"
+
+
+def _profiled_app(directory, **options):
+    profiled = flask.Flask(__name__)
+
+    @profiled.route('/api/evaluate', methods=['POST'])
+    def evaluate_code_api():
+        return "ok"
+
+    return profiled, request_profiler.RequestProfiler(profiled, str(directory), token=TOKEN, **options)
+
+
+def _evaluate(client, question_id, token=TOKEN):
+    # Distinct question ids give distinct file names even within one millisecond
+    return client.post('/api/evaluate', json={"question_id": question_id}, headers={request_profiler.PROFILE_HEADER: token})
+
+
+@pytest.mark.parametrize("max_profiles", [0, -1])
+def test_max_profiles_below_one_is_rejected(tmp_path, max_profiles):
+    with pytest.raises(ValueError):
+        _profiled_app(tmp_path, max_profiles=max_profiles)
+
+
+def test_ring_buffer_keeps_the_newest_profiles(tmp_path):
+    profiled, profiler = _profiled_app(tmp_path, max_profiles=2)
+    client = profiled.test_client()
+    for question_id in range(5):
+        _evaluate(client, question_id)
+    names = [profile['name'] for profile in profiler.list_profiles()]
+    assert len(names) == 2
+    assert "-q4-" in names[0] and "-q3-" in names[1]
+
+
+def test_only_the_right_token_forces_a_profile(tmp_path):
+    profiled, profiler = _profiled_app(tmp_path)
+    client = profiled.test_client()
+    _evaluate(client, 1, token="wrong")
+    _evaluate(client, 2, token="")
+    client.post('/api/evaluate', json={"question_id": 3})
+    assert profiler.list_profiles() == []
+    _evaluate(client, 4)
+    assert len(profiler.list_profiles()) == 1
+
+
+def test_is_authorized_without_token(tmp_path):
+    profiled = flask.Flask(__name__)
+    profiler = request_profiler.RequestProfiler(profiled, str(tmp_path))
+    with profiled.test_request_context(headers={request_profiler.PROFILE_HEADER: ""}):
+        assert not profiler.is_authorized(flask.request)
+
+
+def test_profile_listing_requires_the_token(tmp_path, monkeypatch):
+    client = app.app.test_client()
+    monkeypatch.setattr(app, 'profiler', None)
+    assert client.get('/api/profiles').status_code == 404
+
+    _, profiler = _profiled_app(tmp_path)
+    monkeypatch.setattr(app, 'profiler', profiler)
+    assert client.get('/api/profiles').status_code == 403
+    assert client.get('/api/profiles', headers={request_profiler.PROFILE_HEADER: "wrong"}).status_code == 403
+    response = client.get('/api/profiles', headers={request_profiler.PROFILE_HEADER: TOKEN})
+    assert response.status_code == 200
+    assert response.get_json()["profiles"] == []
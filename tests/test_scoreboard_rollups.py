@@ -0,0 +1,119 @@
+# coding_platform_flask/tests/test_scoreboard_rollups.py
+
+# Tests for the incrementally maintained analytics rollups (scoreboard_rollups.py).
+#
+# Scores are recorded through app.record_scores into a fresh database, and the analytics read
+# from the rollups are compared with values computed directly from the raw scoreboard rows.
+# A rebuild from the raw rows must give the same analytics as the incremental updates.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sqlite3
+import statistics
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import scoreboard_rollups # noqa: E402
+
+CHALLENGE_ID = "sql_basics"
+MAX_SCORE = scoreboard_rollups.max_score(CHALLENGE_ID)
+
+# (score, time_taken_seconds), spread over several score and time buckets including the extremes
+SCORES = [(0, 5), (10, 29), (40, 30), (57, 61), (MAX_SCORE, 119), (MAX_SCORE, 400), (90, 7199), (100, 9000)]
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'DATABASE', str(tmp_path / "scoreboard.db"))
+    app.init_db()
+    return app.DATABASE
+
+
+def _record(rows):
+    with app.app.app_context():
+        app.record_scores([(f"user{i}", CHALLENGE_ID, score, seconds) for i, (score, seconds) in enumerate(rows)])
+
+
+def _analytics(database, challenge_id=CHALLENGE_ID):
+    db = sqlite3.connect(database)
+    try:
+        return scoreboard_rollups.get_analytics(db, challenge_id)
+    finally:
+        db.close()
+
+
+def test_analytics_match_raw_rows(database):
+    _record(SCORES)
+    analytics = _analytics(database)
+    scores = [score for score, _ in SCORES]
+    times = [seconds for _, seconds in SCORES]
+
+    assert analytics['attempts'] == len(SCORES)
+    assert analytics['max_possible_score'] == MAX_SCORE
+    assert analytics['score'] == {"mean": round(statistics.mean(scores), 2), "min": min(scores), "max": max(scores)}
+    assert analytics['time_seconds']['mean'] == round(statistics.mean(times), 1)
+    assert (analytics['time_seconds']['min'], analytics['time_seconds']['max']) == (min(times), max(times))
+    assert sum(bucket['count'] for bucket in analytics['score_histogram']) == len(SCORES)
+    assert sum(bucket['count'] for bucket in analytics['time_histogram']) == len(SCORES)
+    assert analytics['score_histogram'][-1]['count'] == 2 # Full marks land in the last bucket
+    assert analytics['time_histogram'][-1]['count'] == 1 # Above the last bound
+
+
+def test_percentiles_are_ordered_and_within_observed_range(database):
+    _record(SCORES)
+    time_seconds = _analytics(database)['time_seconds']
+    percentiles = [time_seconds['percentiles'][f"p{p}"] for p in scoreboard_rollups.PERCENTILES]
+    assert percentiles == sorted(percentiles)
+    assert all(time_seconds['min'] <= value <= time_seconds['max'] for value in percentiles)
+
+
+def test_rebuild_matches_incremental_updates(database):
+    _record(SCORES[:3])
+    _record(SCORES[3:])
+    incremental = _analytics(database)
+
+    db = sqlite3.connect(database)
+    try:
+        db.execute("DELETE FROM challenge_rollup_bucket WHERE kind = 'time'") # Simulate stale rollups
+        db.commit()
+        assert scoreboard_rollups.rebuild(db) == len(SCORES)
+        rebuilt = scoreboard_rollups.get_analytics(db, CHALLENGE_ID)
+    finally:
+        db.close()
+    assert rebuilt == incremental
+
+
+def test_failed_insert_leaves_rollups_untouched(database):
+    _record(SCORES[:2])
+    with pytest.raises(sqlite3.IntegrityError):
+        with app.app.app_context():
+            app.record_scores([("ok", CHALLENGE_ID, 50, 60), ("broken", CHALLENGE_ID, None, 60)])
+    assert _analytics(database)['attempts'] == 2
+
+
+def test_challenge_without_scores(database):
+    assert _analytics(database, "python_basic_problems") == {
+        "challenge_id": "python_basic_problems", "attempts": 0,
+        "max_possible_score": scoreboard_rollups.max_score("python_basic_problems")}
+
+
+@pytest.mark.parametrize("score, expected", [(0, 0), (MAX_SCORE // 10, 0), (MAX_SCORE * 55 // 100, 5), (MAX_SCORE, 9), (MAX_SCORE * 2, 9)])
+def test_score_bucket(score, expected):
+    assert scoreboard_rollups.score_bucket(score, MAX_SCORE) == expected
+
+
+@pytest.mark.parametrize("seconds, expected", [(0, 0), (29, 0), (30, 1), (7199, 13), (7200, 14), (100000, 14)])
+def test_time_bucket(seconds, expected):
+    assert scoreboard_rollups.time_bucket(seconds) == expected
+
+
+def test_analytics_api(database):
+    _record(SCORES)
+    client = app.app.test_client()
+    assert client.get(f"/api/analytics/{CHALLENGE_ID}").get_json() == _analytics(database)
+    assert client.get("/api/analytics/no_such_challenge").status_code == 404
@@ -0,0 +1,123 @@
+# coding_platform_flask/tests/test_sql_isolation.py
+
+# Isolation tests for the pooled SQL evaluation connections (sql_grading.evaluation_connection).
+#
+# Each hostile submission (writes, DDL, transaction control, pragmas, ATTACH) is graded and then
+# followed by a correct submission on the same question. The correct one must still pass, which
+# proves the hostile submission left no trace on any pooled connection. pool_stats() deltas check
+# that connections are reused after harmless rejections and discarded after DDL.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import questions_data # noqa: E402
+import sql_grading # noqa: E402
+
+READ_ONLY_QUESTION_ID = 3 # "Order Customers by Name": plain SELECT, read-only by default
+WRITABLE_QUESTION_ID = 24 # Performance-graded; allows CREATE INDEX, so not read-only
+
+# (submission template, whether SQLite prepares it as DDL so the connection must be discarded)
+HOSTILE_SUBMISSIONS = [
+    ("DELETE FROM {table};", False),
+    ("INSERT INTO {table} (CustomerID) VALUES (999999);", False),
+    ("UPDATE {table} SET CustomerID = 1;", False),
+    ("DROP TABLE {table};", True),
+    ("CREATE TABLE leaked (value INTEGER);", True),
+    ("COMMIT;", False),
+    ("BEGIN;", False),
+    ("SAVEPOINT escape;", False),
+    ("PRAGMA query_only = OFF;", False),
+    ("ATTACH DATABASE ':memory:' AS other;", False),
+]
+
+
+def _question(question_id):
+    return questions_data.get_question_by_id(question_id)
+
+
+def _correct_submission(question):
+    # Performance-graded questions also need their intended index to pass
+    setup = (question.get('performance') or {}).get('reference_setup')
+    return f"{setup}\n{question['expected_query_output']}" if setup else question['expected_query_output']
+
+
+def _table(question):
+    return "Orders" if question['id'] == WRITABLE_QUESTION_ID else "Customers"
+
+
+def _stats_delta(before):
+    after = sql_grading.pool_stats()
+    return {key: after[key] - before[key] for key in ("created", "reused", "discarded")}
+
+
+def _idle(question):
+    return sql_grading.pool_stats()["idle"].get(question['id'], 0)
+
+
+@pytest.mark.parametrize("question_id", [READ_ONLY_QUESTION_ID, WRITABLE_QUESTION_ID])
+@pytest.mark.parametrize("template, is_ddl", HOSTILE_SUBMISSIONS)
+def test_hostile_submission_does_not_leak(question_id, template, is_ddl):
+    question = _question(question_id)
+    correct = _correct_submission(question)
+    assert app.evaluate_sql(correct, question)['passed_all_tests'] # Baseline on a fresh or pooled connection
+
+    idle_before = _idle(question)
+    before = sql_grading.pool_stats()
+    hostile = app.evaluate_sql(template.format(table=_table(question)), question)
+    delta = _stats_delta(before)
+
+    assert not hostile['passed_all_tests']
+    assert delta["created"] + delta["reused"] == 1
+    if is_ddl:
+        assert delta["discarded"] == 1
+        assert _idle(question) == idle_before - delta["reused"]
+    else:
+        assert delta["discarded"] == 0
+        assert _idle(question) == idle_before - delta["reused"] + 1 # Went back to the pool
+
+    # The next submission on this question sees the original data and schema
+    assert app.evaluate_sql(correct, question)['passed_all_tests']
+
+
+@pytest.mark.parametrize("template", ["COMMIT;", "PRAGMA query_only = OFF;", "ATTACH DATABASE ':memory:' AS other;"])
+def test_denied_statements_are_reported(template):
+    result = app.evaluate_sql(template, _question(READ_ONLY_QUESTION_ID))
+    assert "not authorized" in result['output']
+
+
+def test_read_only_question_rejects_writes():
+    question = _question(READ_ONLY_QUESTION_ID)
+    result = app.evaluate_sql("DELETE FROM Customers;", question)
+    assert "readonly" in result['output']
+
+
+def test_read_only_connection_is_reused():
+    question = _question(READ_ONLY_QUESTION_ID)
+    app.evaluate_sql(question['expected_query_output'], question)
+    before = sql_grading.pool_stats()
+    for _ in range(3):
+        assert app.evaluate_sql(question['expected_query_output'], question)['passed_all_tests']
+    assert _stats_delta(before) == {"created": 0, "reused": 3, "discarded": 0}
+
+
+def test_writes_on_writable_question_are_rolled_back():
+    question = _question(WRITABLE_QUESTION_ID)
+    with sql_grading.evaluation_connection(question) as conn:
+        conn.execute("DELETE FROM Orders")
+        assert conn.execute("SELECT COUNT(*) FROM Orders").fetchone()[0] == 0
+    with sql_grading.evaluation_connection(question) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Orders").fetchone()[0] == 50000
+
+
+def test_introspection_pragmas_are_allowed():
+    question = _question(READ_ONLY_QUESTION_ID)
+    result = app.evaluate_sql("SELECT name FROM pragma_table_info('Customers');", question)
+    assert "not authorized" not in result['output']
+    assert "CustomerName" in result['output']
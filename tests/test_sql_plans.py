@@ -0,0 +1,103 @@
+# coding_platform_flask/tests/test_sql_plans.py
+
+# Tests for performance-graded SQL questions: VM step counting and EXPLAIN QUERY PLAN parsing
+# (sql_grading.run_query / query_plan) and the verdicts of app.evaluate_sql on question 24.
+#
+# The plan names tables the way the query does ("SCAN o" for `FROM Orders o`, "SCAN orders" for
+# `FROM orders`), so full scans must be recognized through aliases and in any letter case.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app # noqa: E402  (imported after adjusting sys.path)
+import questions_data # noqa: E402
+import sql_grading # noqa: E402
+
+ORDERS_LOOKUP_ID = 24 # forbid_full_scan: ["Orders"], allows CREATE INDEX before the query
+INDEX = "CREATE INDEX idx_orders_customer ON Orders (CustomerID);"
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE Orders (OrderID INTEGER PRIMARY KEY, CustomerID INT, Amount REAL);
+        CREATE TABLE Customers (CustomerID INT PRIMARY KEY, CustomerName TEXT);
+        CREATE INDEX idx_customer ON Orders (CustomerID);
+    """)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM Orders WHERE Amount > 5",
+    "SELECT * FROM Orders o WHERE o.Amount > 5",
+    "SELECT OrderID, Amount FROM Orders o WHERE o.Amount > 5", # Select-list comma right before FROM
+    "SELECT * FROM Orders AS o WHERE o.Amount > 5",
+    "SELECT * FROM orders WHERE Amount > 5",
+    "SELECT * FROM ORDERS x WHERE x.Amount > 5",
+    "SELECT * FROM main.Orders WHERE Amount > 5",
+    'SELECT * FROM "Orders" "the orders" WHERE Amount > 5',
+    "SELECT CustomerID FROM Orders o", # Full scan of a covering index
+    "SELECT * FROM Customers c JOIN Orders o ON o.Amount > c.CustomerID",
+    "SELECT * FROM Customers c, Orders o WHERE o.Amount > 1",
+    "WITH recent AS (SELECT * FROM Orders) SELECT * FROM recent",
+])
+def test_full_scans_are_reported_by_table_name(conn, query):
+    assert "Orders" in sql_grading.query_plan(conn, query)['scans']
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM Orders o WHERE o.CustomerID = 3",
+    "SELECT * FROM orders WHERE OrderID = 3",
+])
+def test_index_lookups_are_not_scans(conn, query):
+    plan = sql_grading.query_plan(conn, query)
+    assert plan['scans'] == []
+    assert plan['index_lookups'] == ["Orders"]
+
+
+def test_alias_reused_for_another_table_is_not_confused(conn):
+    plan = sql_grading.query_plan(conn, "SELECT * FROM Customers o WHERE o.CustomerName = 'x'")
+    assert plan['scans'] == ["Customers"]
+
+
+def test_run_query_counts_steps_and_enforces_limit(conn):
+    conn.executemany("INSERT INTO Orders (CustomerID, Amount) VALUES (?, ?)", [(i % 10, i) for i in range(2000)])
+    _, _, scan_steps = sql_grading.run_query(conn, "SELECT * FROM Orders WHERE Amount > 5")
+    _, _, lookup_steps = sql_grading.run_query(conn, "SELECT * FROM Orders WHERE OrderID = 3")
+    assert scan_steps > 10 * lookup_steps
+    with pytest.raises(sql_grading.StepLimitExceeded):
+        sql_grading.run_query(conn, "SELECT * FROM Orders a, Orders b", step_limit=1000)
+
+
+def _evaluate(query):
+    return app.evaluate_sql(query, questions_data.get_question_by_id(ORDERS_LOOKUP_ID))
+
+
+@pytest.mark.parametrize("select", [
+    "SELECT OrderID, Amount FROM Orders o WHERE o.CustomerID + 0 = 4242 ORDER BY OrderID;",
+    "SELECT OrderID, Amount FROM orders WHERE CustomerID + 0 = 4242 ORDER BY OrderID;",
+])
+def test_aliased_or_lowercase_full_scan_fails(select):
+    result = _evaluate(f"{INDEX}\n{select}")
+    assert not result['passed_all_tests']
+    assert result['metrics']['full_scans'] == ["Orders"]
+    assert "Full scan of Orders" in result['output']
+
+
+@pytest.mark.parametrize("select", [
+    "SELECT OrderID, Amount FROM Orders o WHERE o.CustomerID = 4242 ORDER BY OrderID;",
+    "SELECT OrderID, Amount FROM orders WHERE CustomerID = 4242 ORDER BY OrderID;",
+])
+def test_indexed_lookup_passes(select):
+    result = _evaluate(f"{INDEX}\n{select}")
+    assert result['passed_all_tests']
+    assert result['metrics']['full_scans'] == []
@@ -0,0 +1,111 @@
+# coding_platform_flask/tests/test_traffic_capture.py
+
+# Tests for the anonymized traffic recorder (traffic_capture.py) and the capture-reading helpers
+# of benchmarks/replay_traffic.py.
+#
+# Workers each generate their own secret key, so the session hash must come from the shared
+# TRAFFIC_CAPTURE_SALT: recorders with the same salt (i.e. separate workers) must give a participant
+# the same anonymous id, and a recorder without a salt must refuse to start.
+#
+# Run from the project root:
+#     python -m pytest -q tests
+
+import json
+import os
+import sys
+import time
+
+import flask
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+import replay_traffic # noqa: E402  (imported after adjusting sys.path)
+import traffic_capture # noqa: E402
+
+SALT = "shared-capture-salt"
+CODE = "SELECT CustomerName FROM Customers;"
+
+
+def _worker(path, salt=SALT):
+    """A minimal app with captured endpoints and its own random secret key, like one worker process."""
+    worker = flask.Flask(__name__)
+    worker.secret_key = os.urandom(24)
+
+    @worker.route('/', methods=['POST'])
+    def index():
+        flask.session['session_key'] = flask.request.form['session_key']
+        flask.session['challenge_id'] = flask.request.form['challenge_id']
+        flask.session['username'] = flask.request.form['username']
+        return "ok"
+
+    @worker.route('/api/evaluate', methods=['POST'])
+    def evaluate_code_api():
+        return flask.jsonify({"passed_all_tests": True})
+
+    traffic_capture.TrafficRecorder(worker, str(path), salt=salt)
+    return worker
+
+
+def _participate(worker, session_key, username="Ada Lovelace"):
+    client = worker.test_client()
+    client.post('/', data={"session_key": session_key, "challenge_id": "sql_basics", "username": username})
+    client.post('/api/evaluate', json={"question_id": 3, "code": CODE})
+
+
+def _records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("salt", [None, ""])
+def test_salt_is_required(tmp_path, salt):
+    with pytest.raises(ValueError, match="TRAFFIC_CAPTURE_SALT"):
+        _worker(tmp_path / "capture.jsonl", salt=salt)
+
+
+def test_workers_with_the_same_salt_share_identities(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    _participate(_worker(path), "session-a")
+    _participate(_worker(path), "session-a") # Another worker, with a different secret key
+    _participate(_worker(path, salt="other-salt"), "session-a")
+    sessions = [record['session'] for record in _records(path)]
+    assert len(set(sessions[:4])) == 1
+    assert sessions[4] != sessions[0]
+    assert "session-a" not in sessions[0]
+
+
+def test_records_contain_no_personal_data(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    before = time.time()
+    _participate(_worker(path), "session-a")
+    text = path.read_text(encoding='utf-8')
+    assert "Ada Lovelace" not in text and CODE not in text and "session-a" not in text
+    evaluate = _records(path)[1]
+    assert evaluate['endpoint'] == "evaluate_code_api"
+    assert evaluate['shape'] == {"question_id": 3, "code_length": len(CODE), "code_lines": 1, "passed": True}
+    assert before <= evaluate['t'] <= time.time() + 1 # Wall clock, comparable across workers
+
+
+def test_load_capture_groups_flows_by_session(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    first, second = _worker(path), _worker(path)
+    _participate(first, "session-a")
+    _participate(second, "session-b")
+    _participate(second, "session-a") # Same participant continuing on another worker
+    flows = replay_traffic.load_capture(str(path))
+    assert sorted(len(flow) for flow in flows) == [2, 4]
+    for flow in flows:
+        assert len({record['session'] for record in flow}) == 1
+        assert [record['t'] for record in flow] == sorted(record['t'] for record in flow)
+
+
+def test_summarize_reports_captured_and_replayed_latencies(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    _participate(_worker(path), "session-a")
+    flows = replay_traffic.load_capture(str(path))
+    report = replay_traffic.summarize(flows, {"evaluate_code_api": [(10.0, 200), (20.0, 503), (30.0, None)]})
+    assert report["evaluate_code_api"]["requests"] == 3
+    assert report["evaluate_code_api"]["error_rate"] == round(1 / 3, 4)
+    assert report["index"]["requests"] == 0
@@ -0,0 +1,113 @@
+# coding_platform_flask/traffic_capture.py
+
+# Anonymized traffic recorder for capacity planning.
+#
+# When enabled (TRAFFIC_CAPTURE_FILE environment variable, see app.py), every request to the
+# test-taking and scoreboard routes appends one JSON line to the capture file:
+#   {"t": <Unix time in seconds>, "method": "POST", "endpoint": "evaluate_code_api",
+#    "route": "/api/evaluate", "view_args": {...}, "session": <anonymous id>, "challenge_id": ...,
+#    "status": 200, "duration_ms": 41.2, "request_bytes": 123, "response_bytes": 456,
+#    "shape": {...}}
+# Only timing and payload *shapes* are stored: never usernames, IP addresses, submitted code or
+# cookies. Sessions are identified by a keyed hash (HMAC) that cannot be linked back to a session
+# cookie without the key, but still lets the replayer (benchmarks/replay_traffic.py) reproduce each
+# participant's sequence of requests.
+#
+# Several worker processes may append to the same file: timestamps are wall-clock time and the
+# hash key is the TRAFFIC_CAPTURE_SALT every worker is given, so one participant keeps one identity
+# and one timeline across workers. The salt is required: the app's secret key is generated per
+# process (os.urandom), so a key derived from it would split each participant across workers.
+# Each record is written with a single append, so lines from different workers do not interleave.
+
+import hashlib # Anonymous session identifiers
+import hmac # Keyed hashing of session keys
+import json # Capture file format (JSON Lines)
+import threading # Serializes writes from concurrent request threads
+import time # Request timing
+
+import flask # Request context, session and hooks
+
+# Endpoints whose traffic is captured (test flow, navigation and scoreboard pages)
+CAPTURED_ENDPOINTS = {
+    'index', 'get_current_question_api', 'evaluate_code_api', 'evaluate_mcq_batch_api',
+    'next_question_api', 'previous_question_api', 'jump_to_question_api',
+    'scoreboards_list_page', 'scoreboard_page', 'analytics_page', 'analytics_api',
+}
+
+
+def _payload_shape(endpoint, data):
+    """Describes a request payload without its content."""
+    if not isinstance(data, dict):
+        return {}
+    if endpoint == 'evaluate_code_api':
+        code = data.get('code')
+        code = code if isinstance(code, str) else ""
+        return {"question_id": data.get('question_id'), "code_length": len(code), "code_lines": code.count("\n") + 1}
+    if endpoint == 'evaluate_mcq_batch_api':
+        answers = data.get('answers')
+        return {"answers": len(answers) if isinstance(answers, dict) else 0}
+    if endpoint == 'jump_to_question_api':
+        return {"index": data.get('index')}
+    return {}
+
+
+class TrafficRecorder:
+    """
+    Records captured requests of a Flask app to a JSON Lines file.
+    :param app: The Flask application.
+    :param path: File the capture is appended to.
+    :param salt: Key for hashing session keys; must be the same in every worker process.
+    :raises ValueError: If no salt is given.
+    """
+    def __init__(self, app, path, salt):
+        if not salt:
+            raise ValueError("Traffic capture needs a salt shared by all workers (set TRAFFIC_CAPTURE_SALT).")
+        self.path = path
+        self._salt = salt.encode('utf-8') if isinstance(salt, str) else salt
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', buffering=1, encoding='utf-8') # Line-buffered: each record is flushed
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _anonymize(self, session_key):
+        if not session_key:
+            return None
+        return hmac.new(self._salt, session_key.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
+    def _before_request(self):
+        if flask.request.endpoint in CAPTURED_ENDPOINTS:
+            flask.g._capture_started = (time.time(), time.perf_counter()) # Wall clock for "t", perf counter for the duration
+
+    def _after_request(self, response):
+        started = flask.g.pop('_capture_started', None)
+        if started is None:
+            return response
+        started_at, started = started
+        request = flask.request
+        endpoint = request.endpoint
+
+        if endpoint == 'index':
+            shape = {"challenge_id": request.form.get('challenge_id')} if request.method == 'POST' else {}
+        else:
+            shape = _payload_shape(endpoint, request.get_json(silent=True) if request.is_json else None)
+        if endpoint == 'evaluate_code_api' and response.is_json:
+            shape["passed"] = bool((response.get_json(silent=True) or {}).get('passed_all_tests'))
+
+        record = {
+            "t": round(started_at, 4), # When the request arrived
+            "method": request.method,
+            "endpoint": endpoint,
+            "route": request.url_rule.rule if request.url_rule else request.path,
+            "view_args": request.view_args or {},
+            "session": self._anonymize(flask.session.get('session_key')),
+            "challenge_id": flask.session.get('challenge_id'),
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "request_bytes": request.content_length or 0,
+            "response_bytes": response.calculate_content_length() or 0,
+            "shape": shape,
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._file.write(line)
+        return response